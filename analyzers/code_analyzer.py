@@ -1,17 +1,107 @@
 import os
 import re
+import time
+import tempfile
+import threading
+import asyncio
 import logging
+from string import Template
+from collections import defaultdict
+from heapq import nlargest
+from operator import itemgetter
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-from dataclasses import dataclass
-from jira import JIRA
-import gitlab
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from fastapi.concurrency import run_in_threadpool
+from cachetools import TTLCache
+import msgspec
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class CommitInfo:
+# Размеры пула keep-alive соединений: запросы к сервисам выполняются параллельно;
+# JSON ответов разбирается через msgspec (см. _fast_json_hook)
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 64
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.5  # секунд, растет экспоненциально
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Асинхронный HTTP/2 клиент GitLab REST API: один пул соединений на event loop
+GITLAB_HTTP_MAX_CONNECTIONS = 64
+GITLAB_HTTP_MAX_KEEPALIVE = 32
+GITLAB_HTTP_TIMEOUT = 30  # секунд
+
+# Ограничение параллельных запросов деталей коммитов, чтобы не упираться в rate limit GitLab
+COMMIT_DETAILS_WORKERS = 16
+
+# Размер страницы при постраничном обходе GitLab API
+GITLAB_PER_PAGE = 100
+PROJECT_ACTIVITY_DAYS = 365  # проекты без активности дольше не просматриваются
+
+# Количество авторов в текстовом отчете
+REPORT_TOP_AUTHORS = 5
+
+# Из Jira запрашиваются только поля, которые используются в отчете
+JIRA_TASK_FIELDS = 'summary,status,assignee,created,updated'
+JIRA_BATCH_SIZE = 100
+
+# Кэш проанализированных коммитов по (проект, задача) и TTL кэш ответов Jira/Confluence
+COMMIT_CACHE_FILE = "code_analyzer_cache.json"
+COMMIT_CACHE_MAX_ENTRIES = 2000  # пар (проект, задача); сверх лимита вытесняются давно обновленные
+COMMIT_CACHE_MAX_AGE = 30 * 24 * 3600  # секунд; устаревшие записи перечитываются из GitLab
+SOURCE_CACHE_TTL = 300  # секунд
+SOURCE_CACHE_MAXSIZE = 256
+REPORT_CACHE_TTL = 300  # секунд
+REPORT_CACHE_MAXSIZE = 512
+
+def _mount_connection_pool(session: requests.Session) -> requests.Session:
+    """Подключает к HTTP сессии адаптер с пулом соединений и быстрый разбор JSON"""
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(
+            total=HTTP_MAX_RETRIES,
+            backoff_factor=HTTP_RETRY_BACKOFF,
+            status_forcelist=HTTP_RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(_fast_json_hook)
+    return session
+
+def _fast_json_hook(response: requests.Response, *args, **kwargs) -> requests.Response:
+    """Разбирает JSON ответа через msgspec вместо stdlib json (без глобального monkeypatch requests)"""
+    default_json = response.json
+    
+    def fast_json(**json_kwargs):
+        if json_kwargs:
+            return default_json(**json_kwargs)
+        try:
+            return msgspec.json.decode(response.content)
+        except msgspec.DecodeError:
+            # Пустое тело или нестандартная кодировка: ошибку формирует requests
+            return default_json()
+    
+    response.json = fast_json
+    return response
+
+def _create_http_session() -> requests.Session:
+    """Создает HTTP сессию с переиспользованием соединений (Keep-Alive)"""
+    return _mount_connection_pool(requests.Session())
+
+def _parse_iso(value: str) -> datetime:
+    """Разбирает дату ISO-8601 из ответов Jira/GitLab/Confluence (без часового пояса считается UTC)"""
+    date = datetime.fromisoformat(value)
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+class CommitInfo(msgspec.Struct):
     """Информация о коммите"""
     id: str
     message: str
@@ -23,8 +113,7 @@ class CommitInfo:
     lines_removed: int
     url: str
 
-@dataclass
-class ConfluencePage:
+class ConfluencePage(msgspec.Struct):
     """Информация о странице Confluence"""
     id: str
     title: str
@@ -33,8 +122,7 @@ class ConfluencePage:
     created: datetime
     updated: datetime
 
-@dataclass
-class CodeAnalysisReport:
+class CodeAnalysisReport(msgspec.Struct):
     """Отчет по анализу кода"""
     task_key: str
     task_summary: str
@@ -65,6 +153,64 @@ class CodeAnalysisReport:
     development_duration_days: int
     analysis_date: datetime
 
+def _commit_to_dict(commit: CommitInfo) -> Dict[str, Any]:
+    """Сериализует коммит для файлового кэша"""
+    return msgspec.to_builtins(commit)
+
+def _commit_from_dict(data: Dict[str, Any]) -> CommitInfo:
+    """Восстанавливает коммит из файлового кэша"""
+    return CommitInfo(**{**data, 'date': _parse_iso(data['date'])})
+
+# Шаблоны текстового отчета компилируются один раз при импорте модуля
+_UNKNOWN_DATE = 'Неизвестно'
+
+_REPORT_HEADER = Template("""
+📊 **ОТЧЕТ ПО АНАЛИЗУ КОДА ЗАДАЧИ $task_key**
+
+**📋 Информация о задаче:**
+• Название: $task_summary
+• Статус: $task_status
+• Исполнитель: $task_assignee
+• Создана: $task_created
+• Обновлена: $task_updated
+
+**💻 Статистика разработки:**
+• Всего коммитов: $total_commits
+• Строк добавлено: $total_lines_added
+• Строк удалено: $total_lines_removed
+• Файлов изменено: $total_files_changed
+• Длительность разработки: $development_duration_days дней
+
+**👥 Авторы:**
+""")
+
+_REPORT_TIMELINE = Template("""
+**⏰ Временные рамки:**
+• Первый коммит: $first_commit_date
+• Последний коммит: $last_commit_date
+""")
+
+_REPORT_CONFLUENCE_HEADER = Template("""
+**📄 Связанные страницы Confluence ($pages_count):**
+""")
+
+_REPORT_COMMITS_HEADER = """
+**🔗 Последние коммиты:**
+"""
+
+_REPORT_FOOTER = Template("""
+---
+*Отчет сгенерирован: $analysis_date*
+""")
+
+def _fmt_date(date: Optional[datetime]) -> str:
+    """Форматирует дату как ДД.ММ.ГГГГ ЧЧ:ММ без разбора формата strftime"""
+    if not date:
+        return _UNKNOWN_DATE
+    # isoformat(): 'YYYY-MM-DDTHH:MM:SS...'
+    iso = date.isoformat()
+    return f"{iso[8:10]}.{iso[5:7]}.{iso[0:4]} {iso[11:16]}"
+
 class CodeAnalyzer:
     def __init__(self):
         self.jira_url = os.getenv('JIRA_URL')
@@ -80,6 +226,25 @@ class CodeAnalyzer:
         self.gitlab = None
         self.confluence = None
         
+        # Кэши: коммиты растут монотонно, поэтому детали уже проанализированных
+        # коммитов хранятся на диске; задачи и страницы кэшируются ненадолго
+        self._commit_cache = self._load_commit_cache()
+        self._task_info_cache = TTLCache(maxsize=SOURCE_CACHE_MAXSIZE, ttl=SOURCE_CACHE_TTL)
+        # Кэш задач читается и пишется из пула потоков, а TTLCache не потокобезопасен
+        self._task_info_lock = threading.Lock()
+        self._confluence_cache = TTLCache(maxsize=SOURCE_CACHE_MAXSIZE, ttl=SOURCE_CACHE_TTL)
+        self._report_cache = TTLCache(maxsize=REPORT_CACHE_MAXSIZE, ttl=REPORT_CACHE_TTL)
+        
+        # Отдельный ограниченный пул потоков для запросов деталей коммитов
+        # Асинхронный клиент GitLab создается при первом запросе в текущем event loop
+        self._gitlab_http = None
+        self._gitlab_http_loop = None
+        
+        self._commit_executor = ThreadPoolExecutor(
+            max_workers=COMMIT_DETAILS_WORKERS,
+            thread_name_prefix='code-analyzer'
+        )
+        
         self._initialize_connections()
     
     def _initialize_connections(self):
@@ -87,15 +252,24 @@ class CodeAnalyzer:
         try:
             # Jira
             if self.jira_url and self.jira_username and self.jira_token:
+                # Тяжелые SDK импортируются только при наличии настроек сервиса
+                from jira import JIRA
                 self.jira = JIRA(
                     server=self.jira_url,
                     basic_auth=(self.jira_username, self.jira_token)
                 )
+                # JIRA создает собственную сессию, расширяем ее пул соединений
+                _mount_connection_pool(self.jira._session)
                 logger.info("✅ Подключение к Jira успешно")
             
             # GitLab
             if self.gitlab_url and self.gitlab_token:
-                self.gitlab = gitlab.Gitlab(self.gitlab_url, private_token=self.gitlab_token)
+                import gitlab
+                self.gitlab = gitlab.Gitlab(
+                    self.gitlab_url,
+                    private_token=self.gitlab_token,
+                    session=_create_http_session()
+                )
                 self.gitlab.auth()
                 logger.info("✅ Подключение к GitLab успешно")
             
@@ -105,30 +279,80 @@ class CodeAnalyzer:
                 self.confluence = Confluence(
                     url=self.confluence_url,
                     username=self.confluence_username,
-                    password=self.confluence_token
+                    password=self.confluence_token,
+                    session=_create_http_session()
                 )
                 logger.info("✅ Подключение к Confluence успешно")
                 
         except Exception as e:
-            logger.error(f"❌ Ошибка инициализации подключений: {e}")
+            logger.error("❌ Ошибка инициализации подключений: %s", e)
+    
+    def analyze_task_code(self, task_key: str, force: bool = False) -> Optional[CodeAnalysisReport]:
+        """
+        Анализирует код по задаче Jira (синхронная обертка над analyze_task_code_async)
+        
+        Только для кода без работающего event loop; внутри него используйте
+        await analyze_task_code_async().
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "analyze_task_code() нельзя вызывать из работающего event loop: "
+                "используйте await analyze_task_code_async()"
+            )
+        
+        async def analyze_and_close():
+            try:
+                return await self.analyze_task_code_async(task_key, force=force)
+            finally:
+                # asyncio.run закрывает event loop: закрываем клиент, созданный для этого loop,
+                # не трогая клиент другого event loop
+                if self._gitlab_http_loop is asyncio.get_running_loop():
+                    await self.aclose()
+        
+        return asyncio.run(analyze_and_close())
+    
+    async def aclose(self):
+        """Закрывает асинхронный HTTP клиент GitLab"""
+        if self._gitlab_http is not None:
+            await self._gitlab_http.aclose()
+            self._gitlab_http = None
+            self._gitlab_http_loop = None
     
-    def analyze_task_code(self, task_key: str) -> Optional[CodeAnalysisReport]:
+    async def analyze_task_code_async(self, task_key: str, force: bool = False) -> Optional[CodeAnalysisReport]:
         """
         Анализирует код по задаче Jira
+        
+        Сетевые запросы к GitLab и Confluence выполняются параллельно в пуле потоков.
+        Готовые отчеты кэшируются на REPORT_CACHE_TTL секунд, force=True пропускает кэш
         """
+        if not force:
+            report = self._report_cache.get(task_key)
+            if report:
+                logger.info("📦 Отчет по задаче %s взят из кэша", task_key)
+                return report
+        
         try:
-            logger.info(f"🔍 Начинаем анализ задачи {task_key}")
+            logger.info("🔍 Начинаем анализ задачи %s", task_key)
             
-            # Получаем информацию о задаче
-            task_info = self._get_task_info(task_key)
-            if not task_info:
+            # Задача, коммиты и страницы Confluence не зависят друг от друга - запрашиваем параллельно
+            task_info, commits, confluence_pages = await asyncio.gather(
+                run_in_threadpool(self._get_task_info, task_key),
+                self._get_commits_for_task(task_key),
+                self._get_confluence_pages_for_task(task_key),
+                return_exceptions=True
+            )
+            if isinstance(task_info, Exception) or not task_info:
                 return None
-            
-            # Получаем коммиты по задаче
-            commits = self._get_commits_for_task(task_key)
-            
-            # Получаем связанные страницы Confluence
-            confluence_pages = self._get_confluence_pages_for_task(task_key)
+            if isinstance(commits, Exception):
+                logger.warning("Ошибка получения коммитов задачи %s: %s", task_key, commits)
+                commits = []
+            if isinstance(confluence_pages, Exception):
+                logger.warning("Ошибка получения страниц Confluence задачи %s: %s", task_key, confluence_pages)
+                confluence_pages = []
             
             # Анализируем коммиты
             analysis = self._analyze_commits(commits)
@@ -160,11 +384,12 @@ class CodeAnalyzer:
                 analysis_date=datetime.utcnow()
             )
             
-            logger.info(f"✅ Анализ задачи {task_key} завершен")
+            self._report_cache[task_key] = report
+            logger.info("✅ Анализ задачи %s завершен", task_key)
             return report
             
         except Exception as e:
-            logger.error(f"❌ Ошибка анализа задачи {task_key}: {e}")
+            logger.error("❌ Ошибка анализа задачи %s: %s", task_key, e)
             return None
     
     def _get_task_info(self, task_key: str) -> Optional[Dict[str, Any]]:
@@ -173,67 +398,211 @@ class CodeAnalyzer:
             logger.error("Jira не подключен")
             return None
         
+        with self._task_info_lock:
+            task_info = self._task_info_cache.get(task_key)
+        if task_info:
+            return task_info
+        
         try:
-            issue = self.jira.issue(task_key)
+            # Запрос к Jira выполняется без блокировки
+            issue = self.jira.issue(task_key, fields=JIRA_TASK_FIELDS)
             
-            return {
-                'summary': issue.fields.summary,
-                'status': issue.fields.status.name,
-                'assignee': issue.fields.assignee.displayName if issue.fields.assignee else 'Не назначен',
-                'created': datetime.strptime(issue.fields.created, '%Y-%m-%dT%H:%M:%S.%f%z'),
-                'updated': datetime.strptime(issue.fields.updated, '%Y-%m-%dT%H:%M:%S.%f%z')
-            }
+            task_info = self._task_info_from_issue(issue)
+            with self._task_info_lock:
+                self._task_info_cache[task_key] = task_info
+            return task_info
         except Exception as e:
-            logger.error(f"Ошибка получения информации о задаче {task_key}: {e}")
+            logger.error("Ошибка получения информации о задаче %s: %s", task_key, e)
             return None
     
-    def _get_commits_for_task(self, task_key: str) -> List[CommitInfo]:
+    def _get_tasks_info(self, task_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Получает информацию о нескольких задачах из Jira одним JQL запросом"""
+        if not self.jira:
+            logger.error("Jira не подключен")
+            return {}
+        
+        # Одно обращение get на ключ: запись может истечь между проверкой и чтением
+        tasks_info = {}
+        with self._task_info_lock:
+            for key in task_keys:
+                task_info = self._task_info_cache.get(key)
+                if task_info is not None:
+                    tasks_info[key] = task_info
+        missing_keys = [key for key in task_keys if key not in tasks_info]
+        if not missing_keys:
+            return tasks_info
+        
+        for start in range(0, len(missing_keys), JIRA_BATCH_SIZE):
+            batch = missing_keys[start:start + JIRA_BATCH_SIZE]
+            # Ошибка одного пакета (например, несуществующий ключ в JQL) не отменяет остальные
+            try:
+                issues = self.jira.search_issues(
+                    f"key in ({','.join(batch)})",
+                    fields=JIRA_TASK_FIELDS,
+                    maxResults=JIRA_BATCH_SIZE
+                )
+            except Exception as e:
+                logger.error("Ошибка получения информации о задачах %s: %s", ', '.join(batch), e)
+                continue
+            
+            batch_info = {issue.key: self._task_info_from_issue(issue) for issue in issues}
+            with self._task_info_lock:
+                for key, task_info in batch_info.items():
+                    self._task_info_cache[key] = task_info
+            tasks_info.update(batch_info)
+        
+        return tasks_info
+    
+    def _task_info_from_issue(self, issue) -> Dict[str, Any]:
+        """Извлекает нужные поля задачи Jira"""
+        return {
+            'summary': issue.fields.summary,
+            'status': issue.fields.status.name,
+            'assignee': issue.fields.assignee.displayName if issue.fields.assignee else 'Не назначен',
+            'created': _parse_iso(issue.fields.created),
+            'updated': _parse_iso(issue.fields.updated)
+        }
+    
+    async def _get_commits_for_task(self, task_key: str) -> List[CommitInfo]:
         """Получает коммиты связанные с задачей"""
         if not self.gitlab:
             logger.warning("GitLab не подключен")
             return []
         
         try:
-            commits = []
+            # Ищем проекты по ключу задачи
+            projects = await run_in_threadpool(self._list_projects, task_key)
             
-            # Ищем коммиты по ключу задачи в сообщении
-            search_query = f"refs {task_key}"
-            projects = self.gitlab.projects.list(search=task_key, per_page=10)
+            # Поиск GitLab нечеткий: оставляем только коммиты с точным упоминанием ключа
+            # (ABC-1 не должен совпадать с ABC-12)
+            task_pattern = re.compile(rf'{re.escape(task_key)}(?!\d)', re.IGNORECASE)
+            
+            # Ищем коммиты по ключу задачи на стороне GitLab во всех проектах параллельно
+            projects_commits = await asyncio.gather(
+                *(self._search_project_commits(project, task_key, task_pattern) for project in projects),
+                return_exceptions=True
+            )
             
-            for project in projects:
-                try:
-                    # Ищем коммиты в проекте
-                    project_commits = project.commits.list(
-                        ref_name='main',
-                        per_page=100,
-                        since=(datetime.utcnow() - timedelta(days=365)).isoformat()
-                    )
-                    
-                    for commit in project_commits:
-                        if task_key.lower() in commit.message.lower():
-                            commit_info = self._analyze_commit(commit, project)
-                            if commit_info:
-                                commits.append(commit_info)
-                                
-                except Exception as e:
-                    logger.warning(f"Ошибка поиска коммитов в проекте {project.name}: {e}")
+            # Детали уже проанализированных коммитов берем из кэша
+            commits = []
+            candidates = []
+            for project, project_commits in zip(projects, projects_commits):
+                if isinstance(project_commits, Exception):
+                    logger.warning("Ошибка поиска коммитов в проекте %s: %s", project.name, project_commits)
                     continue
+                
+                cached_commits = self._get_cached_commits(project.id, task_key)
+                for commit in project_commits:
+                    if commit['id'] in cached_commits:
+                        commits.append(cached_commits[commit['id']])
+                    else:
+                        candidates.append((commit, project))
+            
+            # Получаем детали новых коммитов параллельно в ограниченном пуле потоков
+            loop = asyncio.get_running_loop()
+            analyzed_commits = await asyncio.gather(
+                *(loop.run_in_executor(self._commit_executor, self._analyze_commit, commit, project)
+                  for commit, project in candidates)
+            )
+            
+            new_commits = [
+                (project, commit_info)
+                for (_, project), commit_info in zip(candidates, analyzed_commits)
+                if commit_info
+            ]
+            if new_commits:
+                for project, commit_info in new_commits:
+                    self._cache_commit(project.id, task_key, commit_info)
+                    commits.append(commit_info)
+                # Снимок кэша делается в потоке event loop: другой анализ может менять словарь,
+                # пока файл записывается в пуле потоков
+                await run_in_threadpool(self._save_commit_cache, msgspec.json.encode(self._commit_cache))
             
             # Сортируем по дате
             commits.sort(key=lambda x: x.date)
             
-            logger.info(f"Найдено {len(commits)} коммитов для задачи {task_key}")
+            logger.info("Найдено %s коммитов для задачи %s", len(commits), task_key)
             return commits
             
         except Exception as e:
-            logger.error(f"Ошибка поиска коммитов: {e}")
+            logger.error("Ошибка поиска коммитов: %s", e)
             return []
     
-    def _analyze_commit(self, commit, project) -> Optional[CommitInfo]:
-        """Анализирует отдельный коммит"""
+    def _list_projects(self, task_key: str) -> List[Any]:
+        """
+        Получает проекты GitLab по ключу задачи (keyset пагинация вместо offset)
+        
+        Повторяющиеся проекты и проекты без активности за PROJECT_ACTIVITY_DAYS дней пропускаются
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=PROJECT_ACTIVITY_DAYS)
+        seen_ids = set()
+        projects = []
+        
+        for project in self.gitlab.projects.list(
+            search=task_key,
+            iterator=True,
+            pagination='keyset',
+            order_by='id',
+            sort='asc',
+            per_page=GITLAB_PER_PAGE
+        ):
+            if project.id in seen_ids:
+                continue
+            seen_ids.add(project.id)
+            
+            last_activity_at = getattr(project, 'last_activity_at', None)
+            if last_activity_at and _parse_iso(last_activity_at) < cutoff:
+                continue
+            
+            projects.append(project)
+        
+        return projects
+    
+    def _get_gitlab_http(self) -> httpx.AsyncClient:
+        """Возвращает асинхронный HTTP/2 клиент GitLab для текущего event loop"""
+        loop = asyncio.get_running_loop()
+        if self._gitlab_http is None or self._gitlab_http_loop is not loop:
+            self._gitlab_http = httpx.AsyncClient(
+                base_url=f"{self.gitlab_url.rstrip('/')}/api/v4",
+                headers={'PRIVATE-TOKEN': self.gitlab_token},
+                timeout=GITLAB_HTTP_TIMEOUT,
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=GITLAB_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=GITLAB_HTTP_MAX_KEEPALIVE
+                    ),
+                    retries=HTTP_MAX_RETRIES
+                )
+            )
+            self._gitlab_http_loop = loop
+        return self._gitlab_http
+    
+    async def _search_project_commits(self, project, task_key: str, task_pattern: re.Pattern) -> List[Dict[str, Any]]:
+        """Ищет коммиты проекта по ключу задачи через поиск GitLab (все страницы результатов)"""
+        http = self._get_gitlab_http()
+        url = f"/projects/{project.id}/search"
+        params = {'scope': 'commits', 'search': task_key, 'per_page': GITLAB_PER_PAGE}
+        commits = []
+        
+        while url:
+            response = await http.get(url, params=params)
+            response.raise_for_status()
+            commits.extend(
+                commit for commit in msgspec.json.decode(response.content)
+                if commit.get('message') and task_pattern.search(commit['message'])
+            )
+            # Следующая страница берется из заголовка Link, параметры уже в URL
+            url = response.links.get('next', {}).get('url')
+            params = None
+        
+        return commits
+    
+    def _analyze_commit(self, commit: Dict[str, Any], project) -> Optional[CommitInfo]:
+        """Анализирует отдельный коммит из результатов поиска"""
         try:
             # Получаем детали коммита
-            commit_details = project.commits.get(commit.id)
+            commit_details = project.commits.get(commit['id'])
             
             # Подсчитываем изменения
             stats = commit_details.stats if hasattr(commit_details, 'stats') else {}
@@ -242,18 +611,18 @@ class CodeAnalyzer:
             files_changed = stats.get('total', 0)
             
             return CommitInfo(
-                id=commit.id,
-                message=commit.message,
-                author=commit.author_name,
-                author_email=commit.author_email,
-                date=datetime.strptime(commit.created_at, '%Y-%m-%dT%H:%M:%S.%fZ'),
+                id=commit['id'],
+                message=commit['message'],
+                author=commit['author_name'],
+                author_email=commit['author_email'],
+                date=_parse_iso(commit['created_at']),
                 files_changed=files_changed,
                 lines_added=lines_added,
                 lines_removed=lines_removed,
-                url=f"{project.web_url}/-/commit/{commit.id}"
+                url=f"{project.web_url}/-/commit/{commit['id']}"
             )
         except Exception as e:
-            logger.warning(f"Ошибка анализа коммита {commit.id}: {e}")
+            logger.warning("Ошибка анализа коммита %s: %s", commit.get('id'), e)
             return None
     
     def _analyze_commits(self, commits: List[CommitInfo]) -> Dict[str, Any]:
@@ -270,35 +639,32 @@ class CodeAnalyzer:
                 'development_duration_days': 0
             }
         
-        # Статистика по строкам
-        total_lines_added = sum(c.lines_added for c in commits)
-        total_lines_removed = sum(c.lines_removed for c in commits)
-        total_files_changed = sum(c.files_changed for c in commits)
+        # Статистика по строкам, датам и авторам собирается за один проход
+        total_lines_added = total_lines_removed = total_files_changed = 0
+        first_commit_date = last_commit_date = commits[0].date
+        author_stats = defaultdict(lambda: {'commits': 0, 'lines_added': 0, 'lines_removed': 0})
         
-        # Даты
-        first_commit_date = min(c.date for c in commits)
-        last_commit_date = max(c.date for c in commits)
-        development_duration_days = (last_commit_date - first_commit_date).days
-        
-        # Анализ авторов
-        author_stats = {}
         for commit in commits:
-            author = commit.author
-            if author not in author_stats:
-                author_stats[author] = {
-                    'name': author,
-                    'commits': 0,
-                    'lines_added': 0,
-                    'lines_removed': 0
-                }
+            total_lines_added += commit.lines_added
+            total_lines_removed += commit.lines_removed
+            total_files_changed += commit.files_changed
             
-            author_stats[author]['commits'] += 1
-            author_stats[author]['lines_added'] += commit.lines_added
-            author_stats[author]['lines_removed'] += commit.lines_removed
+            if commit.date < first_commit_date:
+                first_commit_date = commit.date
+            if commit.date > last_commit_date:
+                last_commit_date = commit.date
+            
+            stats = author_stats[commit.author]
+            stats['commits'] += 1
+            stats['lines_added'] += commit.lines_added
+            stats['lines_removed'] += commit.lines_removed
+        
+        development_duration_days = (last_commit_date - first_commit_date).days
         
-        # Сортируем авторов по количеству коммитов
-        authors = sorted(author_stats.values(), key=lambda x: x['commits'], reverse=True)
-        main_author = authors[0]['name'] if authors else 'Неизвестно'
+        # Полная сортировка не нужна: основной автор - максимум по коммитам,
+        # топ авторов выбирается при генерации отчета
+        authors = [{'name': name, **stats} for name, stats in author_stats.items()]
+        main_author = max(authors, key=itemgetter('commits'))['name']
         
         return {
             'first_commit_date': first_commit_date,
@@ -311,104 +677,163 @@ class CodeAnalyzer:
             'development_duration_days': development_duration_days
         }
     
-    def _get_confluence_pages_for_task(self, task_key: str) -> List[ConfluencePage]:
+    async def _get_confluence_pages_for_task(self, task_key: str) -> List[ConfluencePage]:
         """Получает связанные страницы Confluence"""
         if not self.confluence:
             logger.warning("Confluence не подключен")
             return []
         
+        pages = self._confluence_cache.get(task_key)
+        if pages is not None:
+            return pages
+        
         try:
             pages = []
             
-            # Ищем страницы по ключу задачи
+            # Ищем страницы по ключу задачи; версия и история страниц приходят
+            # в том же ответе, без отдельного запроса на каждую страницу
             cql = f'text ~ "{task_key}"'
-            search_results = self.confluence.cql(cql, limit=10)
+            search_results = await run_in_threadpool(
+                self.confluence.cql, cql, limit=10, expand='content.version,content.history'
+            )
             
             if search_results and search_results.get('results'):
                 for page_data in search_results['results']:
-                    try:
-                        page = self.confluence.get_page_by_id(page_data['id'])
-                        
-                        pages.append(ConfluencePage(
-                            id=page['id'],
-                            title=page['title'],
-                            url=f"{self.confluence_url}/pages/viewpage.action?pageId={page['id']}",
-                            author=page['version']['by']['displayName'],
-                            created=datetime.strptime(page['version']['when'], '%Y-%m-%dT%H:%M:%S.%fZ'),
-                            updated=datetime.strptime(page['version']['when'], '%Y-%m-%dT%H:%M:%S.%fZ')
-                        ))
-                    except Exception as e:
-                        logger.warning(f"Ошибка получения страницы {page_data['id']}: {e}")
-                        continue
+                    page = self._build_confluence_page(page_data)
+                    if page:
+                        pages.append(page)
             
-            logger.info(f"Найдено {len(pages)} страниц Confluence для задачи {task_key}")
+            logger.info("Найдено %s страниц Confluence для задачи %s", len(pages), task_key)
+            self._confluence_cache[task_key] = pages
             return pages
             
         except Exception as e:
-            logger.error(f"Ошибка поиска страниц Confluence: {e}")
+            logger.error("Ошибка поиска страниц Confluence: %s", e)
             return []
     
+    def _build_confluence_page(self, page_data: Dict[str, Any]) -> Optional[ConfluencePage]:
+        """Создает страницу Confluence из результата CQL поиска"""
+        try:
+            content = page_data.get('content', page_data)
+            version = content['version']
+            history = content.get('history', {})
+            
+            return ConfluencePage(
+                id=content['id'],
+                title=content['title'],
+                url=f"{self.confluence_url}/pages/viewpage.action?pageId={content['id']}",
+                author=version['by']['displayName'],
+                created=_parse_iso(history.get('createdDate', version['when'])),
+                updated=_parse_iso(version['when'])
+            )
+        except Exception as e:
+            logger.warning("Ошибка разбора страницы %s: %s", page_data.get('content', page_data).get('id'), e)
+            return None
+    
+    def _load_commit_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает файловый кэш коммитов (без устаревших записей)"""
+        if not os.path.exists(COMMIT_CACHE_FILE):
+            return {}
+        
+        try:
+            with open(COMMIT_CACHE_FILE, 'rb') as f:
+                cache = msgspec.json.decode(f.read())
+        except Exception as e:
+            logger.warning("Ошибка загрузки кэша коммитов: %s", e)
+            return {}
+        
+        cutoff = time.time() - COMMIT_CACHE_MAX_AGE
+        return {key: entry for key, entry in cache.items() if entry.get('cached_at', 0) >= cutoff}
+    
+    def _save_commit_cache(self, data: bytes):
+        """Атомарно записывает снимок кэша коммитов через уникальный временный файл"""
+        tmp_file = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(os.path.abspath(COMMIT_CACHE_FILE)),
+                prefix=f"{os.path.basename(COMMIT_CACHE_FILE)}.",
+                suffix='.tmp',
+                delete=False
+            ) as f:
+                tmp_file = f.name
+                f.write(data)
+            os.replace(tmp_file, COMMIT_CACHE_FILE)
+        except Exception as e:
+            logger.warning("Ошибка сохранения кэша коммитов: %s", e)
+            if tmp_file and os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+    
+    def _get_cached_commits(self, project_id: int, task_key: str) -> Dict[str, CommitInfo]:
+        """Возвращает закэшированные коммиты проекта по задаче"""
+        key = f"{project_id}:{task_key}"
+        entry = self._commit_cache.get(key)
+        if not entry:
+            return {}
+        if entry.get('cached_at', 0) < time.time() - COMMIT_CACHE_MAX_AGE:
+            self._commit_cache.pop(key, None)
+            return {}
+        return {data['id']: _commit_from_dict(data) for data in entry['commits']}
+    
+    def _cache_commit(self, project_id: int, task_key: str, commit: CommitInfo):
+        """Добавляет коммит в кэш проекта по задаче (вызывается в потоке event loop)"""
+        key = f"{project_id}:{task_key}"
+        # Обновленная запись переносится в конец: порядок словаря - порядок обновления
+        entry = self._commit_cache.pop(key, None) or {'commits': []}
+        entry['commits'].append(_commit_to_dict(commit))
+        entry['cached_at'] = time.time()
+        self._commit_cache[key] = entry
+        while len(self._commit_cache) > COMMIT_CACHE_MAX_ENTRIES:
+            self._commit_cache.pop(next(iter(self._commit_cache)))
+    
     def generate_report_text(self, report: CodeAnalysisReport) -> str:
         """Генерирует текстовый отчет"""
         if not report:
             return "❌ Не удалось сгенерировать отчет"
         
-        # Форматируем даты
-        def format_date(date):
-            return date.strftime('%d.%m.%Y %H:%M') if date else 'Неизвестно'
+        format_date = _fmt_date
         
         # Основная информация
-        report_text = f"""
-📊 **ОТЧЕТ ПО АНАЛИЗУ КОДА ЗАДАЧИ {report.task_key}**
-
-**📋 Информация о задаче:**
-• Название: {report.task_summary}
-• Статус: {report.task_status}
-• Исполнитель: {report.task_assignee}
-• Создана: {format_date(report.task_created)}
-• Обновлена: {format_date(report.task_updated)}
-
-**💻 Статистика разработки:**
-• Всего коммитов: {report.total_commits}
-• Строк добавлено: {report.total_lines_added:,}
-• Строк удалено: {report.total_lines_removed:,}
-• Файлов изменено: {report.total_files_changed:,}
-• Длительность разработки: {report.development_duration_days} дней
-
-**👥 Авторы:**
-"""
+        parts = [_REPORT_HEADER.substitute(
+            task_key=report.task_key,
+            task_summary=report.task_summary,
+            task_status=report.task_status,
+            task_assignee=report.task_assignee,
+            task_created=format_date(report.task_created),
+            task_updated=format_date(report.task_updated),
+            total_commits=report.total_commits,
+            total_lines_added=f"{report.total_lines_added:,}",
+            total_lines_removed=f"{report.total_lines_removed:,}",
+            total_files_changed=f"{report.total_files_changed:,}",
+            development_duration_days=report.development_duration_days
+        )]
         
         # Добавляем информацию об авторах
-        for i, author in enumerate(report.authors[:5], 1):
-            report_text += f"• {i}. {author['name']}: {author['commits']} коммитов, +{author['lines_added']} -{author['lines_removed']} строк\n"
+        top_authors = nlargest(REPORT_TOP_AUTHORS, report.authors, key=itemgetter('commits'))
+        parts.extend(
+            f"• {i}. {author['name']}: {author['commits']} коммитов, +{author['lines_added']} -{author['lines_removed']} строк\n"
+            for i, author in enumerate(top_authors, 1)
+        )
         
         # Временные рамки
         if report.first_commit_date and report.last_commit_date:
-            report_text += f"""
-**⏰ Временные рамки:**
-• Первый коммит: {format_date(report.first_commit_date)}
-• Последний коммит: {format_date(report.last_commit_date)}
-"""
+            parts.append(_REPORT_TIMELINE.substitute(
+                first_commit_date=format_date(report.first_commit_date),
+                last_commit_date=format_date(report.last_commit_date)
+            ))
         
         # Confluence страницы
         if report.confluence_pages:
-            report_text += f"""
-**📄 Связанные страницы Confluence ({len(report.confluence_pages)}):**
-"""
-            for page in report.confluence_pages[:5]:
-                report_text += f"• [{page.title}]({page.url})\n"
+            parts.append(_REPORT_CONFLUENCE_HEADER.substitute(pages_count=len(report.confluence_pages)))
+            parts.extend(f"• [{page.title}]({page.url})\n" for page in report.confluence_pages[:5])
         
         # Коммиты
         if report.commits:
-            report_text += f"""
-**🔗 Последние коммиты:**
-"""
-            for commit in report.commits[-3:]:  # Последние 3 коммита
-                report_text += f"• [{commit.id[:8]}]({commit.url}) - {commit.message[:50]}... ({format_date(commit.date)})\n"
+            parts.append(_REPORT_COMMITS_HEADER)
+            parts.extend(
+                f"• [{commit.id[:8]}]({commit.url}) - {commit.message[:50]}... ({format_date(commit.date)})\n"
+                for commit in report.commits[-3:]  # Последние 3 коммита
+            )
         
-        report_text += f"""
----
-*Отчет сгенерирован: {format_date(report.analysis_date)}*
-"""
+        parts.append(_REPORT_FOOTER.substitute(analysis_date=format_date(report.analysis_date)))
         
-        return report_text
+        return "".join(parts)
@@ -8,28 +8,55 @@ MCP Chat - FastAPI приложение для работы с MCP сервер
 # ============================================================================
 
 import os
+import gzip
+import atexit
+import hashlib
+import mimetypes
+import time
 import asyncio
+import queue
 import logging
+import functools
+import anyio
+import orjson
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, Request, Depends, status
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
+from logging.handlers import QueueHandler, QueueListener
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Depends, status
+from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse, Response, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import HTTPBearer
+from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    force=True
 )
+# Формат логов не использует поток и процесс: не собираем эти данные для каждой записи
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+# Записи передаются через очередь: вывод в поток выполняет отдельный поток QueueListener,
+# обработчики запросов не ждут ввода-вывода и блокировки обработчика
+_log_queue = queue.SimpleQueue()
+_root_logger = logging.getLogger()
+_log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(_log_queue)]
+_log_listener.start()
+atexit.register(_log_listener.stop)  # дописывает оставшиеся в очереди записи при выходе
 logger = logging.getLogger(__name__)
 
 # Импорт модулей
 # MCP серверы теперь загружаются автоматически через server_discovery
 from llm_client import LLMClient
-from database import init_database
+from http_client import close_http_client
+from database import init_database, ping_database
 from chat_service import chat_service
 from models import (
     ChatMessage, ChatResponse, ErrorResponse, HealthResponse, ServiceStatus,
@@ -40,10 +67,13 @@ from models import (
     CodeAnalysisRequest, CodeAnalysisResponse,
     LLMConfigRequest, LLMConfigResponse, LLMProviderTestRequest, LLMProviderTestResponse
 )
-from auth.ad_auth import ADAuthenticator
-from auth.session_manager import SessionManager
+from auth import ad_auth as ad_auth_module
+from auth import admin_auth as admin_auth_module
+from auth.session_manager import session_manager
+from auth.session_resolver import session_resolver
 from auth.middleware import AuthMiddleware
-from auth.admin_auth import AdminAuth
+from cors_middleware import FastCORSMiddleware
+from timing_middleware import RequestTimingMiddleware, record_timing
 from config.config_manager import ConfigManager
 from analyzers.code_analyzer import CodeAnalyzer
 from mcp_client import mcp_client, MCPClient
@@ -54,20 +84,112 @@ from config.llm_config import LLMProvider
 # ============================================================================
 
 # Загрузка переменных окружения
-load_dotenv()
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+@functools.cache
+def load_env_file(path: str, mtime: float) -> bool:
+    """Разбирает .env один раз для каждой версии файла; заданные окружением переменные не перезаписываются"""
+    return load_dotenv(path, override=False, verbose=False)
+
+# Без поиска .env вверх по каталогам: файл лежит рядом с приложением
+if os.path.exists(ENV_FILE):
+    load_env_file(ENV_FILE, os.path.getmtime(ENV_FILE))
 
 # Инициализация компонентов
 config_manager = ConfigManager()
-ad_auth = ADAuthenticator()
-session_manager = SessionManager()
-admin_auth = AdminAuth()
 llm_client = LLMClient()
-code_analyzer = CodeAnalyzer()
+
+# Разрешенные значения заголовка Host (пусто - проверка отключена): allowed_hosts в конфигурации
+# или ALLOWED_HOSTS через запятую в окружении; IPv6 адреса указываются в скобках: [::1]
+ALLOWED_HOSTS = frozenset(
+    host.strip().lower().encode()
+    for host in (config_manager.get_config().get("allowed_hosts") or os.getenv("ALLOWED_HOSTS", "").split(","))
+    if host.strip()
+)
+
+# Разрешенные CORS origin (пусто - все): cors_allowed_origins в конфигурации
+# или CORS_ALLOWED_ORIGINS через запятую в окружении
+CORS_ALLOWED_ORIGINS = frozenset(
+    origin.strip().rstrip("/").encode()
+    for origin in (config_manager.get_config().get("cors_allowed_origins") or os.getenv("CORS_ALLOWED_ORIGINS", "").split(","))
+    if origin.strip()
+)
+# Общие экземпляры ADAuthenticator и AdminAuth из модулей auth, а также CodeAnalyzer
+# создаются при первом обращении: см. get_ad_auth(), get_admin_auth(), get_code_analyzer()
 
 # Кэширование статуса сервисов
-_services_status_cache = None
-_services_status_cache_time = 0
 _services_status_cache_interval = 30  # секунд
+_services_status_cache = TTLCache(maxsize=1, ttl=_services_status_cache_interval)
+SERVICES_STATUS_CACHE_KEY = "services"
+SERVICES_STATUS_REFRESH_INTERVAL = 25  # секунд, меньше времени жизни кэша
+_services_status_refresh_task: Optional[asyncio.Task] = None
+# Одновременно выполняется только одно обновление статуса; остальные ждут его результат
+_services_status_refresh_lock = asyncio.Lock()
+# Браузеры и прокси могут отдавать статус из своего кэша, не обращаясь к приложению
+SERVICES_STATUS_HEADERS = {"Cache-Control": f"public, max-age={_services_status_cache_interval}"}
+_services_status_probe_timeout = 2.0  # секунд на проверку одного сервиса
+# Проверки живости и готовности для балансировщиков и оркестраторов (без опроса MCP серверов)
+HEALTHZ_BODY = b'{"status":"ok"}'
+PROBE_HEADERS = {"Cache-Control": "no-store"}
+
+# Кэш HTML страниц: шаблоны не меняются во время работы и читаются с диска один раз
+# (TEMPLATES_AUTO_RELOAD=true отключает кэш для разработки)
+HTML_PAGES = ("index.html", "login.html", "admin.html")
+_html_pages_cache: Dict[str, bytes] = {}
+_html_pages_gzip_cache: Dict[str, bytes] = {}
+_html_pages_etag_cache: Dict[str, str] = {}
+HTML_CACHE_CONTROL = "no-cache"
+GZIP_MINIMUM_SIZE = 1024
+GZIP_COMPRESS_LEVEL = 6
+_templates_auto_reload = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() == "true"
+
+# Параметры cookie сессии, общие для всех способов входа
+SESSION_COOKIE_KWARGS = dict(
+    key="session_id",
+    httponly=True,
+    secure=False,
+    samesite="lax",
+    max_age=24*60*60
+)
+# Заголовок Set-Cookie сессии, собранный один раз (тот же вид, что дает set_cookie Starlette);
+# ID сессии состоит из безопасных для cookie символов и подставляется без экранирования
+SESSION_COOKIE_HEADER_TEMPLATE = (
+    f"{SESSION_COOKIE_KWARGS['key']}={{}}; HttpOnly; Max-Age={SESSION_COOKIE_KWARGS['max_age']}; "
+    f"Path=/; SameSite={SESSION_COOKIE_KWARGS['samesite']}"
+    + ("; Secure" if SESSION_COOKIE_KWARGS['secure'] else "")
+)
+
+# Иконка сайта с заранее вычисленным ETag
+FAVICON_PATH = "static/favicon.ico"
+FAVICON_CACHE_CONTROL = "public, max-age=86400"
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+STATIC_MEMORY_MAX_FILE_SIZE = 256 * 1024  # байт; крупные файлы отдаются с диска
+_favicon_cache: Optional[Tuple[bytes, str]] = None
+
+# Размер пула потоков для блокирующих запросов к Jira/GitLab/Confluence
+THREADPOOL_SIZE = 64
+
+# Выполняющиеся LDAP аутентификации: хэш учетных данных -> задача с результатом
+_inflight_ldap_logins: Dict[str, asyncio.Task] = {}
+# LDAP пользователи, уже синхронизированные с БД: имя -> (хэш атрибутов LDAP, данные для сессии).
+# Срок записи ограничивает, как долго при повторных входах не видны изменения строки
+# пользователя в БД (is_admin, удаление) и насколько устаревает last_login
+LDAP_USER_SYNC_TTL = 300  # секунд
+_ldap_user_sync_cache = TTLCache(maxsize=4096, ttl=LDAP_USER_SYNC_TTL)
+
+# Схема OpenAPI, сериализованная один раз при запуске
+OPENAPI_URL = "/openapi.json"
+_openapi_body: Optional[bytes] = None
+
+# Сервисы, статус которых показывается в админ-панели
+ADMIN_SERVICE_NAMES = ("jira", "atlassian", "gitlab", "onec", "active_directory", "llm", "redis")
+_EMPTY_SECTION: Dict[str, Any] = {}  # общий пустой раздел конфигурации (только для чтения)
+# Сериализованный список LLM провайдеров и версия конфигурации, по которой он построен
+_llm_providers_cache: Optional[Tuple[str, bytes]] = None
+# Ответы админ-панели зависят от версии конфигурации: клиент перепроверяет их по ETag
+ADMIN_CACHE_CONTROL = "private, no-cache"
+# Настройки админ-панели MCP серверов (строятся один раз, сбрасываются при переинициализации)
+_mcp_admin_settings_cache: Optional[Dict[str, Dict[str, Any]]] = None
 
 # MCP серверы теперь инициализируются автоматически через server_discovery
 
@@ -75,23 +197,95 @@ _services_status_cache_interval = 30  # секунд
 app = FastAPI(
     title="MCP Chat API",
     description="API для работы с MCP серверами через чат-интерфейс",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    # Схема OpenAPI и документация отдаются своими маршрутами с заранее сериализованной схемой
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None
 )
 
-# Настройка CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Middleware применяются в обратном порядке регистрации: последний добавленный - внешний
 
 # Подключение middleware аутентификации
-app.add_middleware(AuthMiddleware, session_manager=session_manager)
+app.add_middleware(AuthMiddleware, session_resolver=session_resolver, allowed_hosts=ALLOWED_HOSTS)
+
+# Сжатие ответов (HTML страницы, история чата и другие крупные JSON)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+# Заголовок Server-Timing с общим временем и замерами этапов
+app.add_middleware(RequestTimingMiddleware)
+
+# Настройка CORS (все origin, методы и заголовки, с credentials).
+# Внешний слой: preflight запросы отвечаются без прохода через остальные middleware
+app.add_middleware(FastCORSMiddleware, allowed_origins=CORS_ALLOWED_ORIGINS)
 
 # Подключение статических файлов
-app.mount("/static", StaticFiles(directory="static"), name="static")
+class CachedStaticFiles(StaticFiles):
+    """
+    Статические файлы с заголовком Cache-Control
+    
+    Небольшие файлы читаются в память при создании и отдаются без обращения к диску
+    (с заранее вычисленным ETag), остальные - стандартным StaticFiles.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._blobs: Dict[str, Tuple[bytes, list]] = {}
+        self._load_blobs()
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            blob = self._blobs.get(self.get_path(scope))
+            if blob is not None:
+                await self._send_blob(scope, send, *blob)
+                return
+        await super().__call__(scope, receive, send)
+    
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", STATIC_CACHE_CONTROL)
+        return response
+    
+    def _load_blobs(self):
+        """Читает в память файлы каталога не больше STATIC_MEMORY_MAX_FILE_SIZE"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                full_path = os.path.join(root, file_name)
+                if os.path.islink(full_path) or os.path.getsize(full_path) > STATIC_MEMORY_MAX_FILE_SIZE:
+                    continue
+                with open(full_path, "rb") as f:
+                    content = f.read()
+                media_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                etag = f'"{hashlib.md5(content).hexdigest()}"'.encode()
+                headers = [
+                    (b"content-type", media_type.encode()),
+                    (b"etag", etag),
+                    (b"cache-control", STATIC_CACHE_CONTROL.encode()),
+                ]
+                self._blobs[os.path.relpath(full_path, self.directory)] = (content, headers)
+        logger.info("[OK] Статических файлов в памяти: %s", len(self._blobs))
+    
+    async def _send_blob(self, scope, send, content: bytes, headers: list):
+        """Отдает файл из памяти (304 при совпадении ETag)"""
+        etag = headers[1][1]
+        if_none_match = next((value for name, value in scope["headers"] if name == b"if-none-match"), None)
+        if if_none_match == etag:
+            await send({"type": "http.response.start", "status": 304, "headers": headers[1:]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": headers + [(b"content-length", str(len(content)).encode())],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else content})
+
+app.mount("/static", CachedStaticFiles(directory="static", follow_symlink=False), name="static")
 
 # ============================================================================
 # ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
@@ -102,9 +296,27 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при запуске приложения"""
+    global _services_status_refresh_task
+    
     try:
         logger.info("[STARTUP] Запуск MCP Chat...")
         
+        # Стек middleware собирается Starlette до запуска startup (при обработке lifespan)
+        logger.info("[INFO] Слоев middleware: %s", len(app.user_middleware))
+        logger.info("[INFO] Цикл событий: %s", type(asyncio.get_running_loop()).__module__)
+        
+        # Расширяем пул потоков: обработчики в основном ждут внешние сервисы
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+        
+        # Схема OpenAPI строится и сериализуется один раз на воркер
+        get_openapi_body()
+        
+        # Загрузка HTML страниц в память
+        if not _templates_auto_reload:
+            for template_name in HTML_PAGES:
+                load_html_page(template_name)
+            load_favicon()
+        
         # Инициализация базы данных
         database_url = config_manager.get_database_url()
         if database_url:
@@ -112,9 +324,13 @@ async def startup_event():
         else:
             logger.info("[INFO] База данных отключена в конфигурации")
         
-        # Инициализация MCP клиента
+        # Инициализация MCP клиента с общим LLM клиентом приложения
+        mcp_client.set_llm_client(llm_client)
         await mcp_client.initialize_servers()
         
+        # Фоновое обновление статуса сервисов
+        _services_status_refresh_task = asyncio.create_task(services_status_refresher())
+        
         logger.info("[OK] MCP Chat запущен успешно")
         
     except Exception as e:
@@ -127,9 +343,20 @@ async def shutdown_event():
     try:
         logger.info("[SHUTDOWN] Завершение работы MCP Chat...")
         
+        # Остановка фонового обновления статуса сервисов
+        if _services_status_refresh_task is not None:
+            _services_status_refresh_task.cancel()
+        
         # Закрытие MCP сессий
         await mcp_client.close_all_sessions()
         
+        # Закрытие HTTP клиента анализатора кода
+        if get_code_analyzer.cache_info().currsize:
+            await get_code_analyzer().aclose()
+        
+        # Закрытие общего HTTP клиента LLM провайдеров
+        await close_http_client()
+        
         logger.info("[OK] MCP Chat завершен")
         
     except Exception as e:
@@ -138,27 +365,50 @@ async def shutdown_event():
 # --- Статические страницы ---
 
 @app.get("/", response_class=HTMLResponse)
-async def index():
+async def index(request: Request):
     """Главная страница"""
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
+    return get_html_page("index.html", request)
 
 @app.get("/login", response_class=HTMLResponse)
-async def login_page():
+async def login_page(request: Request):
     """Страница входа"""
-    with open("templates/login.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
+    return get_html_page("login.html", request)
 
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_page():
+async def admin_page(request: Request):
     """Админ-панель"""
-    with open("templates/admin.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
+    return get_html_page("admin.html", request)
 
 @app.get("/favicon.ico")
-async def favicon():
+async def favicon(request: Request):
     """Иконка сайта"""
-    return FileResponse("static/favicon.ico")
+    favicon_data = load_favicon()
+    if not favicon_data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Иконка не найдена")
+    
+    content, etag = favicon_data
+    headers = {"ETag": etag, "Cache-Control": FAVICON_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=content, media_type="image/x-icon", headers=headers)
+
+# --- Документация API ---
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_schema():
+    """Схема OpenAPI (сериализуется один раз)"""
+    return Response(content=get_openapi_body(), media_type="application/json")
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui():
+    """Swagger UI"""
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{app.title} - Swagger UI")
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_ui():
+    """ReDoc"""
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc")
 
 # --- Аутентификация ---
 
@@ -166,56 +416,29 @@ async def favicon():
 async def login(login_data: LoginRequest):
     """Аутентификация пользователя через локальную БД или LDAP"""
     try:
-        logger.info(f"🔍 Попытка входа пользователя: {login_data.username}")
+        logger.debug("🔍 Попытка входа пользователя: %s", login_data.username)
         
         # Шаг 1: Проверяем локальную аутентификацию в таблице users
-        logger.info("📋 Проверяем локальную аутентификацию в БД...")
-        db_user = chat_service.authenticate_local_user(login_data.username, login_data.password)
+        logger.debug("📋 Проверяем локальную аутентификацию в БД...")
+        db_user = await run_in_threadpool(chat_service.authenticate_local_user, login_data.username, login_data.password)
         
         if db_user:
             # Локальная аутентификация успешна
-            logger.info(f"[OK] Локальная аутентификация успешна: {db_user.username}")
+            logger.info("[OK] Локальная аутентификация успешна: %s", db_user.username)
             
             # Подготавливаем данные пользователя для сессии
-            user_info = {
-                "id": db_user.id,
-                "username": db_user.username,
-                "display_name": db_user.display_name or db_user.username,
-                "email": db_user.email or "",
-                "groups": db_user.groups or [],
-                "is_admin": db_user.is_admin
-            }
-            
-            # Создаем JWT токен и сессию
-            access_token = ad_auth.create_access_token(user_info)
-            session_id = session_manager.create_session(user_info, access_token)
-            
-            # Создаем ответ
-            response = LoginResponse(
-                success=True,
-                message="Успешная локальная аутентификация",
-                user_info=user_info
-            )
+            user_info = build_session_user_info(db_user)
             
-            # Устанавливаем cookie
-            from fastapi.responses import JSONResponse
-            json_response = JSONResponse(content=response.dict(), status_code=200)
-            json_response.set_cookie(
-                key="session_id",
-                value=session_id,
-                httponly=True,
-                secure=False,
-                samesite="lax",
-                max_age=24*60*60
-            )
+            # Создаем сессию; JWT не нужен: сессия на сервере - единственный источник
+            # истины, а токен клиенту не передается
+            session_id = await run_in_threadpool(session_manager.create_session, user_info, None)
             
-            logger.info(f"🍪 Cookie установлен: session_id={session_id}")
-            logger.info(f"📊 Сессия создана: {session_id}")
+            logger.debug("📊 Сессия создана: %s", session_id)
             
-            return json_response
+            return build_login_response(user_info, "Успешная локальная аутентификация", session_id)
         
         # Шаг 2: Если локальная аутентификация не удалась, проверяем LDAP (если включен)
-        logger.info("🔍 Локальная аутентификация не удалась, проверяем LDAP...")
+        logger.debug("🔍 Локальная аутентификация не удалась, проверяем LDAP...")
         
         # Получаем конфигурацию LDAP
         ad_config = config_manager.get_service_config('active_directory')
@@ -229,67 +452,33 @@ async def login(login_data: LoginRequest):
             )
         
         # Аутентификация через LDAP
-        logger.info("🌐 Проверяем аутентификацию через LDAP...")
-        ldap_user_info = ad_auth.authenticate_user(login_data.username, login_data.password)
+        logger.debug("🌐 Проверяем аутентификацию через LDAP...")
+        ldap_user_info = await authenticate_ldap_user(login_data.username, login_data.password)
         
         if not ldap_user_info:
-            logger.warning(f"[ERROR] LDAP аутентификация не удалась для: {login_data.username}")
+            logger.warning("[ERROR] LDAP аутентификация не удалась для: %s", login_data.username)
             return LoginResponse(
                 success=False,
                 message="Неверные учетные данные или пользователь не найден в Active Directory"
             )
         
         # Шаг 3: LDAP аутентификация успешна - создаем/обновляем пользователя в БД
-        logger.info(f"[OK] LDAP аутентификация успешна: {ldap_user_info['username']}")
+        logger.info("[OK] LDAP аутентификация успешна: %s", ldap_user_info['username'])
         
         # Добавляем флаг LDAP пользователя
         ldap_user_info['is_ldap_user'] = True
         
-        # Создаем или обновляем пользователя в БД
-        logger.info(f"💾 Создаем/обновляем LDAP пользователя в БД: {ldap_user_info['username']}")
-        db_user = chat_service.get_or_create_user(ldap_user_info['username'], ldap_user_info)
-        logger.info(f"[OK] LDAP пользователь создан/обновлен в БД: {db_user.id}")
-        
-        # Подготавливаем данные пользователя для сессии с ID из БД
-        user_info = {
-            "id": db_user.id,
-            "username": db_user.username,
-            "display_name": db_user.display_name or db_user.username,
-            "email": db_user.email or "",
-            "groups": db_user.groups or [],
-            "is_admin": db_user.is_admin,
-            "is_ldap_user": True
-        }
+        # Создаем или обновляем пользователя в БД и получаем данные для сессии с ID из БД
+        user_info = await sync_ldap_user(ldap_user_info)
         
         # Создаем JWT токен и сессию
-        access_token = ad_auth.create_access_token(user_info)
-        session_id = session_manager.create_session(user_info, access_token)
-        
-        # Создаем ответ
-        response = LoginResponse(
-            success=True,
-            message="Успешная LDAP аутентификация",
-            user_info=ldap_user_info
-        )
-        
-        # Устанавливаем cookie
-        from fastapi.responses import JSONResponse
-        json_response = JSONResponse(content=response.dict(), status_code=200)
-        json_response.set_cookie(
-            key="session_id",
-            value=session_id,
-            httponly=True,
-            secure=False,
-            samesite="lax",
-            max_age=24*60*60
-        )
+        access_token = get_ad_auth().create_access_token(user_info)
+        session_id = await run_in_threadpool(session_manager.create_session, user_info, access_token)
         
-        return json_response
+        return build_login_response(ldap_user_info, "Успешная LDAP аутентификация", session_id)
     
     except Exception as e:
-        logger.error(f"[ERROR] Ошибка аутентификации: {str(e)}")
-        import traceback
-        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        logger.exception("[ERROR] Ошибка аутентификации: %s", e)
         return LoginResponse(
             success=False,
             message=f"Ошибка аутентификации: {str(e)}"
@@ -309,7 +498,7 @@ async def get_current_user(request: Request):
             )
         
         # Проверяем сессию
-        session_data = session_manager.get_session(session_id)
+        session_data = session_resolver.get_session(session_id)
         if not session_data:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -340,12 +529,12 @@ async def logout(request: Request):
     try:
         session_id = request.cookies.get('session_id')
         if session_id:
-            session_manager.delete_session(session_id)
+            await run_in_threadpool(session_manager.delete_session, session_id)
+            session_resolver.invalidate(session_id)
         
-        response = LogoutResponse(success=True, message="Успешный выход")
-        from fastapi.responses import JSONResponse
-        json_response = JSONResponse(content=response.dict(), status_code=200)
-        json_response.delete_cookie(key="session_id")
+        # Тело ответа той же формы, что LogoutResponse, без построения модели pydantic
+        json_response = ORJSONResponse(content={"success": True, "message": "Успешный выход"}, status_code=200)
+        json_response.delete_cookie(key=SESSION_COOKIE_KWARGS["key"])
         return json_response
     except Exception as e:
         return LogoutResponse(success=False, message=f"Ошибка выхода: {str(e)}")
@@ -355,12 +544,16 @@ async def logout(request: Request):
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(chat_message: ChatMessage, request: Request):
     """Обработка сообщений чат-бота (только для аутентифицированных пользователей)"""
+    # Заполняются по ходу обработки: при ошибке сообщение пользователя сохраняется отдельно
+    active_session = None
+    user_message_row = None
+    turn_saved = False
     try:
-        logger.info("🔍 Начинаем обработку сообщения чата")
+        logger.debug("🔍 Начинаем обработку сообщения чата")
         
         # Используем универсальную функцию для получения пользователя
         user = await get_user_from_session(request)
-        logger.info(f"[OK] Получен пользователь: {user.get('username')}")
+        logger.debug("[OK] Получен пользователь: %s", user.get('username'))
         
         user_message = chat_message.message.strip()
         
@@ -368,37 +561,24 @@ async def chat(chat_message: ChatMessage, request: Request):
             raise HTTPException(status_code=400, detail="Сообщение не может быть пустым")
         
         # Получаем или создаем пользователя в базе данных
-        db_user = chat_service.get_or_create_user(user.get('username'), user)
-        logger.info(f"[OK] Получен/создан пользователь БД: {db_user.id}")
-        
-        # Получаем или создаем активную сессию
-        active_session = chat_service.get_active_session(db_user.id)
-        if not active_session:
-            active_session = chat_service.create_chat_session(db_user.id)
-            logger.info(f"[OK] Создана новая сессия: {active_session.id}")
-        else:
-            logger.info(f"[OK] Используется существующая сессия: {active_session.id}")
-        
-        # Сохраняем сообщение пользователя
-        logger.info("💾 Сохраняем сообщение пользователя...")
-        user_message_data = chat_service.add_message(
-            active_session.id, 
-            db_user.id, 
-            'user', 
-            user_message,
-            {'ip': request.client.host if request.client else None}
-        )
-        logger.info(f"[OK] Сообщение пользователя сохранено: {user_message_data['id']}")
-        
-        # Получаем историю сообщений сессии для контекста
-        logger.info("📚 Получаем историю сообщений сессии...")
-        session_history = chat_service.get_session_history(active_session.id, limit=10)
-        logger.info(f"[OK] Получена история: {len(session_history)} сообщений")
+        db_user_id = await get_db_user_id(user)
+        
+        # Сообщение пользователя сохраняется вместе с ответом ассистента одной транзакцией
+        user_message_row = {
+            'message_type': 'user',
+            'content': user_message,
+            'metadata': {'ip': request.client.host if request.client else None},
+            'created_at': datetime.utcnow()
+        }
         
-        # Получаем дополнительный контекст пользователя
-        logger.info("🧠 Получаем дополнительный контекст пользователя...")
-        user_additional_context = chat_service.get_user_context(db_user.id)
-        logger.info(f"[OK] Контекст пользователя получен: {len(user_additional_context or '')} символов")
+        # Активная сессия с историей и дополнительный контекст пользователя
+        # независимы и загружаются параллельно
+        (active_session, session_history), user_additional_context = await asyncio.gather(
+            load_active_chat_session(db_user_id),
+            run_in_threadpool(chat_service.get_user_context, db_user_id)
+        )
+        logger.debug("[OK] Получена история: %s сообщений", len(session_history))
+        logger.debug("[OK] Контекст пользователя получен: %s символов", len(user_additional_context or ''))
         
         # Определяем, нужно ли использовать ReAct агента
         use_react = chat_message.use_react if hasattr(chat_message, 'use_react') else False
@@ -419,20 +599,15 @@ async def chat(chat_message: ChatMessage, request: Request):
         }
         
         # Определяем команду и вызываем соответствующий MCP сервер
-        logger.info("🤖 Обрабатываем команду с контекстом чата...")
+        logger.debug("🤖 Обрабатываем команду с контекстом чата...")
+        llm_started = time.perf_counter()
         response = await process_command(user_message, user_context)
-        logger.info(f"[OK] Получен ответ: {response[:100]}...")
-        
-        # Сохраняем ответ ассистента
-        logger.info("💾 Сохраняем ответ ассистента...")
-        assistant_message_data = chat_service.add_message(
-            active_session.id, 
-            db_user.id, 
-            'assistant', 
-            response,
-            {'session_id': active_session.id}
-        )
-        logger.info(f"[OK] Ответ ассистента сохранен: {assistant_message_data['id']}")
+        record_timing(request, "llm", (time.perf_counter() - llm_started) * 1000)
+        logger.debug("[OK] Получен ответ: %s...", response[:100])
+        
+        # Сохраняем сообщения до ответа клиенту: следующее сообщение должно увидеть этот обмен в истории
+        turn_saved = True
+        await run_in_threadpool(save_chat_turn, active_session.id, db_user_id, user_message_row, response)
         
         return ChatResponse(
             response=response,
@@ -442,9 +617,10 @@ async def chat(chat_message: ChatMessage, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[ERROR] Ошибка в chat endpoint: {str(e)}")
-        import traceback
-        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        logger.exception("[ERROR] Ошибка в chat endpoint: %s", e)
+        if active_session is not None and not turn_saved:
+            # Ответа нет, но сообщение пользователя не должно потеряться
+            await run_in_threadpool(save_user_message, active_session.id, db_user_id, user_message_row)
         raise HTTPException(
             status_code=500, 
             detail=f"Ошибка обработки сообщения: {str(e)}"
@@ -457,10 +633,11 @@ async def get_chat_sessions(request: Request):
     """Получает список сессий чата пользователя"""
     try:
         user = await get_user_from_session(request)
-        db_user = chat_service.get_or_create_user(user.get('username'), user)
-        sessions = chat_service.get_user_sessions(db_user.id)
+        db_user_id = await get_db_user_id(user)
+        sessions = await run_in_threadpool(chat_service.get_user_sessions, db_user_id)
         
-        return {
+        # Готовый ответ сериализуется orjson без обхода jsonable_encoder
+        return ORJSONResponse(content={
             "sessions": [
                 {
                     "id": session_data["id"],
@@ -471,9 +648,9 @@ async def get_chat_sessions(request: Request):
                 }
                 for session_data in sessions
             ]
-        }
+        })
     except Exception as e:
-        logger.error(f"[ERROR] Ошибка получения сессий: {e}")
+        logger.error("[ERROR] Ошибка получения сессий: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка получения сессий: {str(e)}")
 
 @app.get("/api/chat/sessions/{session_id}/history")
@@ -481,17 +658,18 @@ async def get_session_history(session_id: int, request: Request):
     """Получает историю конкретной сессии"""
     try:
         user = await get_user_from_session(request)
-        db_user = chat_service.get_or_create_user(user.get('username'), user)
+        db_user_id = await get_db_user_id(user)
         
         # Проверяем, что сессия принадлежит пользователю
-        sessions = chat_service.get_user_sessions(db_user.id)
-        if not any(session_data["id"] == session_id for session_data in sessions):
+        if not await run_in_threadpool(chat_service.session_belongs_to_user, session_id, db_user_id):
             raise HTTPException(status_code=403, detail="Доступ к сессии запрещен")
         
-        history = chat_service.get_session_history(session_id)
-        return {"history": history}
+        history = await run_in_threadpool(chat_service.get_session_history, session_id)
+        return ORJSONResponse(content={"history": history})
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"[ERROR] Ошибка получения истории: {e}")
+        logger.error("[ERROR] Ошибка получения истории: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка получения истории: {str(e)}")
 
 @app.post("/api/chat/sessions/{session_id}/close")
@@ -499,17 +677,18 @@ async def close_session(session_id: int, request: Request):
     """Закрывает сессию чата"""
     try:
         user = await get_user_from_session(request)
-        db_user = chat_service.get_or_create_user(user.get('username'), user)
+        db_user_id = await get_db_user_id(user)
         
         # Проверяем, что сессия принадлежит пользователю
-        sessions = chat_service.get_user_sessions(db_user.id)
-        if not any(session_data["id"] == session_id for session_data in sessions):
+        if not await run_in_threadpool(chat_service.session_belongs_to_user, session_id, db_user_id):
             raise HTTPException(status_code=403, detail="Доступ к сессии запрещен")
         
-        chat_service.close_session(session_id)
+        await run_in_threadpool(chat_service.close_session, session_id)
         return {"message": "Сессия закрыта"}
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"[ERROR] Ошибка закрытия сессии: {e}")
+        logger.error("[ERROR] Ошибка закрытия сессии: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка закрытия сессии: {str(e)}")
 
 @app.get("/api/chat/stats")
@@ -517,8 +696,8 @@ async def get_user_stats(request: Request):
     """Получает статистику пользователя"""
     try:
         user = await get_user_from_session(request)
-        db_user = chat_service.get_or_create_user(user.get('username'), user)
-        stats = chat_service.get_user_stats(db_user.id)
+        db_user_id = await get_db_user_id(user)
+        stats = await run_in_threadpool(chat_service.get_user_stats, db_user_id)
         return stats
     except Exception as e:
         logger.error(f"[ERROR] Ошибка получения статистики: {e}")
@@ -530,38 +709,10 @@ async def get_user_stats(request: Request):
 async def get_user_context(request: Request):
     """Получает контекст текущего пользователя"""
     try:
-        # Получаем session_id из cookies
-        session_id = request.cookies.get('session_id')
-        
-        if not session_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Требуется аутентификация"
-            )
-        
-        # Проверяем сессию
-        session_data = session_manager.get_session(session_id)
-        if not session_data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Сессия истекла"
-            )
-        
-        # Получаем ID пользователя
-        user_info = session_data.get('user_info', {})
-        user_id = user_info.get('id')
-        
-        logger.info(f"🔍 Отладка контекста пользователя: user_info={user_info}, user_id={user_id}")
-        
-        if not user_id:
-            logger.error(f"[ERROR] ID пользователя не найден в сессии: {user_info}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="ID пользователя не найден в сессии"
-            )
+        user_id = await get_session_user_id(request)
         
         # Получаем контекст пользователя
-        context = chat_service.get_user_context(user_id)
+        context = await run_in_threadpool(chat_service.get_user_context, user_id)
         
         return {
             "success": True,
@@ -582,32 +733,7 @@ async def get_user_context(request: Request):
 async def save_user_context(request: Request, context_data: dict):
     """Сохраняет контекст пользователя"""
     try:
-        # Получаем session_id из cookies
-        session_id = request.cookies.get('session_id')
-        
-        if not session_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Требуется аутентификация"
-            )
-        
-        # Проверяем сессию
-        session_data = session_manager.get_session(session_id)
-        if not session_data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Сессия истекла"
-            )
-        
-        # Получаем ID пользователя
-        user_info = session_data.get('user_info', {})
-        user_id = user_info.get('id')
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="ID пользователя не найден в сессии"
-            )
+        user_id = await get_session_user_id(request)
         
         # Получаем контекст из запроса
         context = context_data.get('context', '')
@@ -618,7 +744,7 @@ async def save_user_context(request: Request, context_data: dict):
             )
         
         # Сохраняем контекст
-        success = chat_service.save_user_context(user_id, context)
+        success = await run_in_threadpool(chat_service.save_user_context, user_id, context)
         
         if success:
             return {
@@ -645,32 +771,7 @@ async def save_user_context(request: Request, context_data: dict):
 async def update_user_context(request: Request, context_data: dict):
     """Обновляет контекст пользователя (добавляет к существующему)"""
     try:
-        # Получаем session_id из cookies
-        session_id = request.cookies.get('session_id')
-        
-        if not session_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Требуется аутентификация"
-            )
-        
-        # Проверяем сессию
-        session_data = session_manager.get_session(session_id)
-        if not session_data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Сессия истекла"
-            )
-        
-        # Получаем ID пользователя
-        user_info = session_data.get('user_info', {})
-        user_id = user_info.get('id')
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="ID пользователя не найден в сессии"
-            )
+        user_id = await get_session_user_id(request)
         
         # Получаем новый контекст из запроса
         new_context = context_data.get('context', '')
@@ -681,7 +782,7 @@ async def update_user_context(request: Request, context_data: dict):
             )
         
         # Обновляем контекст
-        success = chat_service.update_user_context(user_id, new_context)
+        success = await run_in_threadpool(chat_service.update_user_context, user_id, new_context)
         
         if success:
             return {
@@ -708,35 +809,10 @@ async def update_user_context(request: Request, context_data: dict):
 async def clear_user_context(request: Request):
     """Очищает контекст пользователя"""
     try:
-        # Получаем session_id из cookies
-        session_id = request.cookies.get('session_id')
-        
-        if not session_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Требуется аутентификация"
-            )
-        
-        # Проверяем сессию
-        session_data = session_manager.get_session(session_id)
-        if not session_data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Сессия истекла"
-            )
-        
-        # Получаем ID пользователя
-        user_info = session_data.get('user_info', {})
-        user_id = user_info.get('id')
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="ID пользователя не найден в сессии"
-            )
+        user_id = await get_session_user_id(request)
         
         # Очищаем контекст
-        success = chat_service.clear_user_context(user_id)
+        success = await run_in_threadpool(chat_service.clear_user_context, user_id)
         
         if success:
             return {
@@ -761,11 +837,14 @@ async def clear_user_context(request: Request):
 
 # --- Администрирование ---
 
-@app.post("/api/admin/login", response_model=AdminLoginResponse)
+# Эндпоинты админ-панели собраны в отдельный роутер и не попадают в схему OpenAPI
+admin_router = APIRouter(prefix="/api/admin", include_in_schema=False)
+
+@admin_router.post("/login", response_model=AdminLoginResponse)
 async def admin_login(login_data: AdminLoginRequest):
     """Аутентификация админа"""
     try:
-        success = admin_auth.authenticate_admin(login_data.username, login_data.password)
+        success = await run_in_threadpool(get_admin_auth().authenticate_admin, login_data.username, login_data.password)
         
         if success:
             return AdminLoginResponse(
@@ -783,23 +862,21 @@ async def admin_login(login_data: AdminLoginRequest):
             message=f"Ошибка аутентификации: {str(e)}"
         )
 
-@app.get("/api/admin/info")
-async def get_admin_info():
+@admin_router.get("/info")
+async def get_admin_info(request: Request, response: Response):
     """Получает информацию для админ-панели"""
     try:
-        config = config_manager.get_config()
+        config, version = config_manager.get_config_with_version()
+        not_modified = apply_config_etag(request, response, "info", version)
+        if not_modified is not None:
+            return not_modified
         
         admin_info = AdminInfo(
             services_status={
-                "jira": {"enabled": config.get("jira", {}).get("enabled", False)},
-                "atlassian": {"enabled": config.get("atlassian", {}).get("enabled", False)},
-                "gitlab": {"enabled": config.get("gitlab", {}).get("enabled", False)},
-                "onec": {"enabled": config.get("onec", {}).get("enabled", False)},
-                "active_directory": {"enabled": config.get("active_directory", {}).get("enabled", False)},
-                "llm": {"enabled": config.get("llm", {}).get("enabled", False)},
-                "redis": {"enabled": config.get("redis", {}).get("enabled", False)}
+                name: {"enabled": config.get(name, _EMPTY_SECTION).get("enabled", False)}
+                for name in ADMIN_SERVICE_NAMES
             },
-            llm_providers=config.get("llm", {}).get("providers", {}),
+            llm_providers=config.get("llm", _EMPTY_SECTION).get("providers", {}),
             last_updated=config.get("last_updated"),
             updated_by=config.get("updated_by")
         )
@@ -809,57 +886,20 @@ async def get_admin_info():
         logger.error(f"[ERROR] Ошибка получения информации админа: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка получения информации: {str(e)}")
 
-@app.get("/api/admin/config")
-async def get_admin_config():
+@admin_router.get("/config")
+async def get_admin_config(request: Request, response: Response):
     """Получает конфигурацию для админ-панели"""
     try:
-        config = config_manager.get_config()
-        
-        # Получаем динамические настройки MCP серверов
-        mcp_servers_config = {}
-        
-        try:
-            from mcp_servers import get_discovered_servers, create_server_instance
-            
-            discovered_servers = get_discovered_servers()
-            logger.info(f"🔍 Обнаружено MCP серверов: {len(discovered_servers)}")
-            
-            for server_name, server_class in discovered_servers.items():
-                try:
-                    # Создаем экземпляр сервера
-                    server_instance = create_server_instance(server_name)
-                    
-                    if server_instance:
-                        # Получаем настройки админ-панели
-                        admin_settings = server_instance.get_admin_settings()
-                        
-                        # Получаем текущую конфигурацию сервера
-                        server_config = config.get(server_name, {})
-                        
-                        # Объединяем настройки
-                        mcp_servers_config[server_name] = {
-                            **admin_settings,
-                            'config': server_config
-                        }
-                        
-                        logger.info(f"[OK] Настройки сервера {server_name} загружены")
-                    
-                except Exception as e:
-                    logger.warning(f"[WARN] Не удалось загрузить настройки сервера {server_name}: {e}")
-                    # Добавляем базовые настройки
-                    mcp_servers_config[server_name] = {
-                        'name': server_name,
-                        'display_name': f'{server_name.title()} MCP',
-                        'description': f'MCP сервер для {server_name}',
-                        'icon': 'fas fa-server',
-                        'category': 'mcp_servers',
-                        'fields': [],
-                        'enabled': False,
-                        'config': {}
-                    }
-            
-        except Exception as e:
-            logger.error(f"[ERROR] Ошибка получения настроек MCP серверов: {e}")
+        config, version = config_manager.get_config_with_version()
+        not_modified = apply_config_etag(request, response, "config", version)
+        if not_modified is not None:
+            return not_modified
+        
+        # Настройки MCP серверов берутся из кэша, конфигурация - текущая
+        mcp_servers_config = {
+            server_name: {**admin_settings, 'config': config.get(server_name, {})}
+            for server_name, admin_settings in get_mcp_admin_settings().items()
+        }
         
         # Возвращаем полную конфигурацию
         return {
@@ -871,11 +911,12 @@ async def get_admin_config():
         logger.error(f"[ERROR] Ошибка получения конфигурации админа: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка получения конфигурации: {str(e)}")
 
-@app.post("/api/admin/config/update", response_model=ConfigUpdateResponse)
+@admin_router.post("/config/update", response_model=ConfigUpdateResponse)
 async def update_config(config_request: ConfigUpdateRequest):
     """Обновляет конфигурацию системы"""
     try:
-        success = config_manager.update_config(
+        success = await run_in_threadpool(
+            config_manager.update_config,
             config_request.section,
             config_request.settings,
             "admin"
@@ -901,11 +942,11 @@ async def update_config(config_request: ConfigUpdateRequest):
             message=f"Ошибка обновления конфигурации: {str(e)}"
         )
 
-@app.post("/api/admin/config/test", response_model=ConnectionTestResponse)
+@admin_router.post("/config/test", response_model=ConnectionTestResponse)
 async def test_connection(test_request: ConnectionTestRequest):
     """Тестирует подключение к сервису"""
     try:
-        result = config_manager.test_connection(test_request.service)
+        result = await run_in_threadpool(config_manager.test_connection, test_request.service)
         return ConnectionTestResponse(
             success=result["success"],
             message=result["message"]
@@ -917,24 +958,31 @@ async def test_connection(test_request: ConnectionTestRequest):
             message=f"Ошибка тестирования: {str(e)}"
         )
 
+app.include_router(admin_router)
+
 # --- Анализ кода ---
 
 @app.post("/api/analyze-code", response_model=CodeAnalysisResponse)
 async def analyze_code(analysis_request: CodeAnalysisRequest, request: Request):
-    """Анализирует код с помощью LLM"""
+    """Анализирует код по задаче Jira (коммиты GitLab и страницы Confluence)"""
     try:
         user = await get_user_from_session(request)
         
-        analysis_result = await code_analyzer.analyze_code(
-            analysis_request.code,
-            analysis_request.language,
-            analysis_request.analysis_type
+        # Запросы к внешним сервисам выполняются в пуле потоков, не блокируя event loop
+        report = await get_code_analyzer().analyze_task_code_async(
+            analysis_request.task_key,
+            force=analysis_request.force
         )
+        if not report:
+            return CodeAnalysisResponse(
+                success=False,
+                message=f"Не удалось проанализировать задачу {analysis_request.task_key}"
+            )
         
         return CodeAnalysisResponse(
             success=True,
             message="Анализ кода выполнен успешно",
-            analysis=analysis_result
+            report=get_code_analyzer().generate_report_text(report)
         )
         
     except Exception as e:
@@ -946,93 +994,150 @@ async def analyze_code(analysis_request: CodeAnalysisRequest, request: Request):
 
 # --- Статус сервисов ---
 
-@app.get("/api/services/status", response_model=HealthResponse)
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Проверка живости процесса (без обращения к внешним сервисам)"""
+    return Response(content=HEALTHZ_BODY, media_type="application/json", headers=PROBE_HEADERS)
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Проверка готовности: доступность Redis и базы данных"""
+    redis_ready, database_ready = await asyncio.gather(
+        run_status_probe(session_manager.is_connected),
+        run_status_probe(ping_database),
+        return_exceptions=True
+    )
+    checks = {
+        "redis": "ok" if redis_ready is True else "fail",
+        "database": "ok" if database_ready is True else "fail"
+    }
+    ready = redis_ready is True and database_ready is True
+    return ORJSONResponse(
+        content={"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=200 if ready else 503,
+        headers=PROBE_HEADERS
+    )
+
+@app.get("/api/services/status", response_model=None, responses={200: {"model": HealthResponse}})
 async def get_services_status():
-    """Получает статус всех сервисов с кэшированием"""
-    global _services_status_cache, _services_status_cache_time
-    
+    """Получает статус всех сервисов с кэшированием (кэш обновляется фоновой задачей)"""
     try:
-        current_time = datetime.utcnow().timestamp()
-        
-        # Проверяем, нужно ли обновить кэш
-        if (_services_status_cache is None or 
-            current_time - _services_status_cache_time > _services_status_cache_interval):
-            
-            logger.debug("[RELOAD] Обновляем кэш статуса сервисов")
-            
-            # Используем кэшированные серверы из mcp_client
-            mcp_services = {}
-            
-            # Получаем кэшированные серверы
-            cached_servers = mcp_client._get_builtin_servers()
-            
-            for server_name, server in cached_servers.items():
-                try:
-                    # Используем кэшированное состояние подключения
-                    health_status = server.get_health_status()
-                    mcp_services[server_name] = {"status": health_status.get('status', 'inactive')}
-                except Exception:
-                    mcp_services[server_name] = {"status": "inactive"}
-            
-            # Проверяем статус LLM
-            llm_status = "active"
-            try:
-                if llm_client.provider:
-                    llm_status = "active"
-                else:
-                    llm_status = "inactive"
-            except Exception:
-                llm_status = "inactive"
-            
-            services = {
-                **mcp_services,
-                "llm": {"status": llm_status},
-                "database": {"status": "active"},
-                "redis": {"status": "active" if session_manager.is_connected() else "inactive"}
-            }
-            
-            # Кэшируем результат
-            _services_status_cache = HealthResponse(
-                status="healthy",
-                services=services,
-                timestamp=datetime.utcnow().isoformat()
-            )
-            _services_status_cache_time = current_time
-            
-            logger.debug("[OK] Кэш статуса сервисов обновлен")
-        else:
+        # В кэше хранится уже сериализованный ответ: попадание не требует обхода модели
+        cached_body = _services_status_cache.get(SERVICES_STATUS_CACHE_KEY)
+        if cached_body is not None:
             logger.debug("[RELOAD] Используем кэшированный статус сервисов")
+            return Response(content=cached_body, media_type="application/json", headers=SERVICES_STATUS_HEADERS)
         
-        return _services_status_cache
+        async with _services_status_refresh_lock:
+            # Пока ждали блокировку, кэш мог заполнить другой запрос или фоновая задача
+            body = _services_status_cache.get(SERVICES_STATUS_CACHE_KEY)
+            if body is None:
+                body = await refresh_services_status()
+        return Response(content=body, media_type="application/json", headers=SERVICES_STATUS_HEADERS)
         
     except Exception as e:
         logger.error(f"[ERROR] Ошибка получения статуса сервисов: {e}")
         return HealthResponse(
             status="unhealthy",
             services={},
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=format_status_timestamp(int(time.time()))
         )
 
+async def refresh_services_status() -> bytes:
+    """Опрашивает сервисы и сохраняет сериализованный статус в кэш"""
+    logger.debug("[RELOAD] Обновляем кэш статуса сервисов")
+    
+    # Используем кэшированные серверы из mcp_client
+    mcp_services = {}
+    
+    # Получаем кэшированные серверы
+    cached_servers = list(mcp_client._get_builtin_servers().items())
+    
+    # Проверки блокирующие, поэтому выполняются параллельно в пуле потоков с таймаутом
+    *health_results, redis_connected = await asyncio.gather(
+        *(run_status_probe(server.get_health_status) for _, server in cached_servers),
+        run_status_probe(session_manager.is_connected),
+        return_exceptions=True
+    )
+    
+    for (server_name, _), health_status in zip(cached_servers, health_results):
+        if isinstance(health_status, BaseException):
+            mcp_services[server_name] = {"status": "inactive"}
+        else:
+            mcp_services[server_name] = {"status": health_status.get('status', 'inactive')}
+    
+    # Проверяем статус LLM
+    llm_status = "active"
+    try:
+        if llm_client.provider:
+            llm_status = "active"
+        else:
+            llm_status = "inactive"
+    except Exception:
+        llm_status = "inactive"
+    
+    services = {
+        **mcp_services,
+        "llm": {"status": llm_status},
+        "database": {"status": "active"},
+        "redis": {"status": "active" if redis_connected is True else "inactive"}
+    }
+    
+    # Кэшируем результат
+    status_response = HealthResponse(
+        status="healthy",
+        services=services,
+        timestamp=format_status_timestamp(int(time.time()))
+    )
+    body = status_response.model_dump_json().encode()
+    _services_status_cache[SERVICES_STATUS_CACHE_KEY] = body
+    
+    logger.debug("[OK] Кэш статуса сервисов обновлен")
+    return body
+
+async def services_status_refresher():
+    """Фоновая задача: обновляет статус сервисов до истечения кэша, чтобы запросы не ждали проверок"""
+    while True:
+        try:
+            async with _services_status_refresh_lock:
+                await refresh_services_status()
+        except Exception as e:
+            logger.warning(f"[WARN] Ошибка фонового обновления статуса сервисов: {e}")
+        await asyncio.sleep(SERVICES_STATUS_REFRESH_INTERVAL)
+
+@functools.lru_cache(maxsize=1)
+def format_status_timestamp(second: int) -> str:
+    """Возвращает ISO-метку времени, вычисляемую не чаще раза в секунду"""
+    return datetime.utcfromtimestamp(second).isoformat()
+
+async def run_status_probe(probe):
+    """Выполняет блокирующую проверку статуса сервиса в пуле потоков с таймаутом"""
+    return await asyncio.wait_for(run_in_threadpool(probe), timeout=_services_status_probe_timeout)
+
 def invalidate_services_status_cache():
     """Сбрасывает кэш статуса сервисов (полезно при изменении конфигурации)"""
-    global _services_status_cache, _services_status_cache_time
-    _services_status_cache = None
-    _services_status_cache_time = 0
+    _services_status_cache.clear()
     logger.info("[RELOAD] Кэш статуса сервисов сброшен")
 
 # --- LLM провайдеры ---
 
-@app.get("/api/llm/providers", response_model=LLMConfigResponse)
+@app.get("/api/llm/providers", response_model=None, responses={200: {"model": LLMConfigResponse}})
 async def get_llm_providers():
-    """Получает список доступных LLM провайдеров"""
+    """Получает список доступных LLM провайдеров (ответ кэшируется до изменения конфигурации)"""
+    global _llm_providers_cache
     try:
-        config = config_manager.get_service_config('llm')
-        providers = config.get('providers', {})
-        
-        return LLMConfigResponse(
-            current_provider=config.get('provider', 'ollama'),
-            providers=providers
-        )
+        config, version = config_manager.get_config_with_version()
+        cached = _llm_providers_cache
+        if version is not None and cached is not None and cached[0] == version:
+            return Response(content=cached[1], media_type="application/json")
+        
+        llm_config = config.get('llm', _EMPTY_SECTION)
+        body = LLMConfigResponse(
+            current_provider=llm_config.get('provider', 'ollama'),
+            providers=llm_config.get('providers', {})
+        ).model_dump_json().encode()
+        _llm_providers_cache = (version, body)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         logger.error(f"[ERROR] Ошибка получения LLM провайдеров: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка получения провайдеров: {str(e)}")
@@ -1069,9 +1174,120 @@ async def test_llm_provider(test_request: LLMProviderTestRequest):
 # СЛУЖЕБНЫЕ ФУНКЦИИ
 # ============================================================================
 
+def load_html_page(template_name: str) -> bytes:
+    """Читает HTML страницу из templates/ и кэширует ее содержимое"""
+    content = _html_pages_cache.get(template_name)
+    if content is None:
+        with open(os.path.join("templates", template_name), "rb") as f:
+            content = f.read()
+        _html_pages_cache[template_name] = content
+        _html_pages_gzip_cache[template_name] = gzip.compress(content, compresslevel=GZIP_COMPRESS_LEVEL)
+        _html_pages_etag_cache[template_name] = hashlib.blake2s(content, digest_size=8).hexdigest()
+    return content
+
+def load_favicon() -> Optional[Tuple[bytes, str]]:
+    """Читает иконку сайта один раз и вычисляет ETag по времени изменения и размеру"""
+    global _favicon_cache
+    
+    if _favicon_cache is None:
+        if not os.path.exists(FAVICON_PATH):
+            return None
+        with open(FAVICON_PATH, "rb") as f:
+            content = f.read()
+        etag = f'"{int(os.path.getmtime(FAVICON_PATH))}-{len(content):x}"'
+        _favicon_cache = (content, etag)
+    return _favicon_cache
+
+def get_openapi_body() -> bytes:
+    """Возвращает схему OpenAPI, сериализованную при первом обращении"""
+    global _openapi_body
+    
+    if _openapi_body is None:
+        _openapi_body = orjson.dumps(app.openapi())
+    return _openapi_body
+
+def get_html_page(template_name: str, request: Request = None):
+    """Возвращает HTML страницу из кэша (или с диска при TEMPLATES_AUTO_RELOAD)"""
+    if _templates_auto_reload:
+        return FileResponse(os.path.join("templates", template_name), media_type="text/html")
+    content = load_html_page(template_name)
+    etag_value = _html_pages_etag_cache[template_name]
+    use_gzip = request is not None and "gzip" in request.headers.get("accept-encoding", "")
+    
+    # У сжатой версии свой ETag, чтобы кэши не путали представления
+    etag = f'"{etag_value}-gz"' if use_gzip else f'"{etag_value}"'
+    headers = {"ETag": etag, "Cache-Control": HTML_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if request is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Отдаем заранее сжатую версию, если клиент поддерживает gzip
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=_html_pages_gzip_cache[template_name], media_type="text/html", headers=headers)
+    return HTMLResponse(content=content, headers=headers)
+
+def get_mcp_admin_settings() -> Dict[str, Dict[str, Any]]:
+    """Возвращает настройки админ-панели всех MCP серверов, собирая их при первом обращении"""
+    global _mcp_admin_settings_cache
+    
+    if _mcp_admin_settings_cache is not None:
+        return _mcp_admin_settings_cache
+    
+    settings = {}
+    try:
+        from mcp_servers import get_server_instances
+        
+        # Экземпляры серверов создаются один раз и берутся из кэша
+        server_instances = get_server_instances()
+        logger.debug(f"🔍 Обнаружено MCP серверов: {len(server_instances)}")
+        
+        for server_name, server_instance in server_instances.items():
+            try:
+                if server_instance:
+                    settings[server_name] = server_instance.get_admin_settings()
+                    logger.info(f"[OK] Настройки сервера {server_name} загружены")
+            except Exception as e:
+                logger.warning(f"[WARN] Не удалось загрузить настройки сервера {server_name}: {e}")
+                # Добавляем базовые настройки
+                settings[server_name] = {
+                    'name': server_name,
+                    'display_name': f'{server_name.title()} MCP',
+                    'description': f'MCP сервер для {server_name}',
+                    'icon': 'fas fa-server',
+                    'category': 'mcp_servers',
+                    'fields': [],
+                    'enabled': False
+                }
+    except Exception as e:
+        logger.error(f"[ERROR] Ошибка получения настроек MCP серверов: {e}")
+        # Не кэшируем неудачную попытку
+        return settings
+    
+    _mcp_admin_settings_cache = settings
+    return settings
+
+def apply_config_etag(request: Request, response: Response, name: str,
+                      version: Optional[str]) -> Optional[Response]:
+    """
+    Добавляет к ответу админ-панели ETag по версии конфигурации
+    
+    Returns:
+        Ответ 304, если у клиента актуальная версия, иначе None
+    """
+    if version is None:
+        return None
+    # Слабый ETag: представление не меняется между сохранениями конфигурации,
+    # но GZip может изменить байты ответа
+    etag = f'W/"{name}-{version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ADMIN_CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ADMIN_CACHE_CONTROL
+    return None
+
 def reinitialize_system():
     """Переинициализирует все компоненты системы"""
-    global llm_client, mcp_client, config_manager
+    global llm_client, mcp_client, config_manager, _mcp_admin_settings_cache
     
     try:
         print("[RELOAD] Переинициализация системы...")
@@ -1079,6 +1295,12 @@ def reinitialize_system():
         # Сбрасываем кэш статуса сервисов
         invalidate_services_status_cache()
         
+        # Сбрасываем настройки админ-панели MCP серверов (зависят от enabled)
+        _mcp_admin_settings_cache = None
+        
+        # Сбрасываем кэш синхронизации LDAP пользователей (могла смениться БД)
+        _ldap_user_sync_cache.clear()
+        
         # Переинициализация конфигурации
         config_manager = ConfigManager()
         
@@ -1086,23 +1308,24 @@ def reinitialize_system():
         llm_client = LLMClient()
         
         # Переинициализация MCP клиента
-        mcp_client = MCPClient()
+        mcp_client = MCPClient(llm_client=llm_client)
         
         # Переинициализация MCP серверов динамически
-        from mcp_servers import get_discovered_servers, create_server_instance
+        from mcp_servers import get_server_instances
         
-        discovered_servers = get_discovered_servers()
-        for server_name in discovered_servers.keys():
+        for server_name, server in get_server_instances().items():
             try:
-                server = create_server_instance(server_name)
                 if server:
                     server.reconnect()
             except Exception as e:
                 logger.warning(f"[WARN] Не удалось переподключить сервер {server_name}: {e}")
         
         # Переинициализация аутентификации
-        ad_auth.reconnect()
+        # Экземпляр мог создать не только get_ad_auth(), но и проверка JWT в session_resolver
+        if ad_auth_module._ad_auth is not None:
+            ad_auth_module._ad_auth.reconnect()
         session_manager.reconnect()
+        session_resolver.clear()
         
         print("[OK] Система переинициализирована")
         
@@ -1110,7 +1333,16 @@ def reinitialize_system():
         print(f"[ERROR] Ошибка переинициализации: {e}")
 
 async def get_user_from_session(request: Request) -> dict:
-    """Получает информацию о пользователе из сессии (универсальный механизм)"""
+    """
+    Получает информацию о пользователе из сессии (универсальный механизм)
+    
+    Данные, уже проверенные AuthMiddleware или ранее в этом запросе, берутся
+    из request.state без повторного обращения к хранилищу сессий.
+    """
+    user_info = getattr(request.state, 'user_info', None)
+    if user_info:
+        return user_info
+    
     # Получаем session_id из cookies
     session_id = request.cookies.get('session_id')
     
@@ -1121,7 +1353,7 @@ async def get_user_from_session(request: Request) -> dict:
         )
     
     # Проверяем сессию
-    session_data = session_manager.get_session(session_id)
+    session_data = session_resolver.get_session(session_id)
     if not session_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1135,8 +1367,177 @@ async def get_user_from_session(request: Request) -> dict:
             detail="Информация о пользователе не найдена"
         )
     
+    request.state.user_info = user_info
+    request.state.session_id = session_id
+    return user_info
+
+def build_session_user_info(db_user, is_ldap_user: bool = False) -> dict:
+    """Формирует данные пользователя для сессии из записи БД (значения по умолчанию подставляются здесь)"""
+    user_info = {
+        "id": db_user.id,
+        "username": db_user.username,
+        "display_name": db_user.display_name or db_user.username,
+        "email": db_user.email or "",
+        "groups": db_user.groups or [],
+        "is_admin": db_user.is_admin,
+        "db_user_id": db_user.id
+    }
+    if is_ldap_user:
+        user_info["is_ldap_user"] = True
     return user_info
 
+async def sync_ldap_user(ldap_user_info: dict) -> dict:
+    """
+    Создает/обновляет LDAP пользователя в БД и возвращает данные для сессии
+    
+    Если атрибуты LDAP не изменились с прошлого входа, запись в БД пропускается
+    и используются данные из кэша.
+    """
+    username = ldap_user_info['username']
+    attrs_hash = hashlib.blake2b(
+        orjson.dumps(ldap_user_info, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).digest()
+    cached = _ldap_user_sync_cache.get(username)
+    if cached is not None and cached[0] == attrs_hash:
+        logger.debug("📦 Атрибуты LDAP пользователя не изменились: %s", username)
+        return dict(cached[1])
+    
+    logger.debug("💾 Создаем/обновляем LDAP пользователя в БД: %s", username)
+    db_user = await run_in_threadpool(chat_service.get_or_create_user, username, ldap_user_info)
+    logger.debug("[OK] LDAP пользователь создан/обновлен в БД: %s", db_user.id)
+    
+    user_info = build_session_user_info(db_user, is_ldap_user=True)
+    _ldap_user_sync_cache[username] = (attrs_hash, user_info)
+    return dict(user_info)
+
+def build_login_response(user_info: dict, message: str, session_id: str) -> ORJSONResponse:
+    """Формирует ответ успешного входа с cookie сессии"""
+    # Тело ответа той же формы, что LoginResponse, сериализуется orjson без построения модели pydantic
+    json_response = ORJSONResponse(
+        content={"success": True, "message": message, "user_info": user_info},
+        status_code=200
+    )
+    json_response.raw_headers.append(
+        (b"set-cookie", SESSION_COOKIE_HEADER_TEMPLATE.format(session_id).encode("latin-1"))
+    )
+    logger.debug("🍪 Cookie установлен: session_id=%s", session_id)
+    return json_response
+
+async def authenticate_ldap_user(username: str, password: str) -> Optional[dict]:
+    """
+    Аутентифицирует пользователя через LDAP с кэшем результатов
+    
+    Одновременные одинаковые попытки входа ожидают один общий запрос к LDAP.
+    Кэшируются только ответы LDAP: ошибки (сервер недоступен) выбрасываются
+    исключением и не запоминаются как неудачный вход.
+    """
+    cached_auth = session_manager.get_cached_auth(username, password)
+    if cached_auth is not None:
+        logger.debug("📦 Результат LDAP аутентификации взят из кэша")
+        # Копия: вызывающий код дополняет данные пользователя, а in-memory кэш хранит исходный словарь
+        cached_info = cached_auth['info']
+        return dict(cached_info) if cached_info else None
+    
+    key = hashlib.sha256(f"{username}:{password}".encode()).hexdigest()
+    task = _inflight_ldap_logins.get(key)
+    if task is not None:
+        logger.debug("⏳ Ожидаем уже выполняющуюся LDAP аутентификацию: %s", username)
+    else:
+        # Запрос к LDAP выполняется отдельной задачей, не привязанной к первому запросу:
+        # отмена одного из ожидающих (разрыв соединения) не прерывает остальных.
+        # Между проверкой и записью нет await, поэтому блокировка не нужна
+        task = asyncio.create_task(run_ldap_authentication(username, password))
+        _inflight_ldap_logins[key] = task
+        task.add_done_callback(functools.partial(finish_ldap_authentication, key))
+    
+    ldap_user_info = await asyncio.shield(task)
+    return dict(ldap_user_info) if ldap_user_info else None
+
+async def run_ldap_authentication(username: str, password: str) -> Optional[dict]:
+    """Выполняет LDAP аутентификацию в пуле потоков и кэширует ответ LDAP"""
+    ldap_user_info = await run_in_threadpool(
+        get_ad_auth().authenticate_user, username, password, raise_errors=True
+    )
+    session_manager.cache_auth(username, password, ldap_user_info)
+    return ldap_user_info
+
+def finish_ldap_authentication(key: str, task: asyncio.Task):
+    """Убирает завершенную LDAP аутентификацию из списка выполняющихся"""
+    if _inflight_ldap_logins.get(key) is task:
+        del _inflight_ldap_logins[key]
+    # Исключение могли не получить: все ожидающие запросы были отменены
+    if not task.cancelled():
+        task.exception()
+
+def save_chat_turn(session_id: int, user_id: int, user_message_row: dict, response: str):
+    """Сохраняет сообщение пользователя и ответ ассистента одной транзакцией"""
+    try:
+        messages_data = chat_service.add_messages(session_id, user_id, [
+            user_message_row,
+            {
+                'message_type': 'assistant',
+                'content': response,
+                'metadata': {'session_id': session_id}
+            }
+        ])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[OK] Сообщения чата сохранены: %s", [message['id'] for message in messages_data])
+    except Exception as e:
+        logger.error("[ERROR] Ошибка сохранения сообщений чата: %s", e)
+
+def save_user_message(session_id: int, user_id: int, user_message_row: dict):
+    """Сохраняет сообщение пользователя без ответа (обработка сообщения завершилась ошибкой)"""
+    try:
+        chat_service.add_messages(session_id, user_id, [user_message_row])
+    except Exception as e:
+        logger.error("[ERROR] Ошибка сохранения сообщения пользователя: %s", e)
+
+def get_ad_auth() -> "ad_auth_module.ADAuthenticator":
+    """Возвращает общий аутентификатор AD (создается модулем auth при первом обращении)"""
+    return ad_auth_module.ad_auth
+
+def get_admin_auth() -> "admin_auth_module.AdminAuth":
+    """Возвращает общий аутентификатор администратора (создается модулем auth при первом обращении)"""
+    return admin_auth_module.admin_auth
+
+@functools.cache
+def get_code_analyzer() -> CodeAnalyzer:
+    """Возвращает анализатор кода (подключения к Jira/GitLab/Confluence при первом обращении)"""
+    return CodeAnalyzer()
+
+async def get_session_user_id(request: Request) -> int:
+    """Возвращает ID пользователя из сессии (401 без действующей сессии, 400 без ID)"""
+    user_info = await get_user_from_session(request)
+    user_id = user_info.get('id')
+    if not user_id:
+        logger.error("[ERROR] ID пользователя не найден в сессии: %s", user_info)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID пользователя не найден в сессии"
+        )
+    return user_id
+
+async def get_db_user_id(user_info: dict) -> int:
+    """Возвращает ID пользователя в БД из данных сессии (без запроса к БД)"""
+    db_user_id = user_info.get('db_user_id')
+    if db_user_id is None:
+        # Сессии, созданные до сохранения db_user_id
+        db_user = await run_in_threadpool(chat_service.get_or_create_user, user_info.get('username'), user_info)
+        db_user_id = db_user.id
+    return db_user_id
+
+async def load_active_chat_session(db_user_id: int) -> Tuple[Any, list]:
+    """Возвращает активную сессию чата пользователя (создает при отсутствии) и ее последние сообщения"""
+    active_session = await run_in_threadpool(chat_service.get_active_session, db_user_id)
+    if not active_session:
+        active_session = await run_in_threadpool(chat_service.create_chat_session, db_user_id)
+        logger.debug("[OK] Создана новая сессия: %s", active_session.id)
+    else:
+        logger.debug("[OK] Используется существующая сессия: %s", active_session.id)
+    
+    session_history = await run_in_threadpool(chat_service.get_session_history, active_session.id, limit=10)
+    return active_session, session_history
+
 async def process_command(message: str, user_context: dict = None) -> str:
     """Обрабатывает команды пользователя с использованием MCP клиента"""
     try:
@@ -1151,39 +1552,14 @@ async def process_command(message: str, user_context: dict = None) -> str:
 # API ENDPOINTS ДЛЯ УПРАВЛЕНИЯ СЕССИЯМИ ЧАТА
 # ============================================================================
 
-async def get_current_user_info(request: Request) -> dict:
-    """Получает информацию о текущем пользователе из сессии"""
-    session_id = request.cookies.get('session_id')
-    if not session_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Сессия не найдена"
-        )
-    
-    session_data = session_manager.get_session(session_id)
-    if not session_data:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Сессия истекла"
-        )
-    
-    user_info = session_data.get('user_info')
-    if not user_info:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Информация о пользователе не найдена"
-        )
-    
-    return user_info
-
 @app.get("/api/chat/sessions")
 async def get_chat_sessions(request: Request):
     """Получает список сессий чата пользователя"""
     try:
-        user_info = await get_current_user_info(request)
+        user_info = await get_user_from_session(request)
         user_id = user_info['id']
         
-        sessions = chat_service.get_user_sessions(user_id, limit=50)
+        sessions = await run_in_threadpool(chat_service.get_user_sessions, user_id, limit=50)
         
         return {
             "success": True,
@@ -1203,12 +1579,12 @@ async def get_chat_sessions(request: Request):
 async def create_chat_session(request: Request, session_data: dict):
     """Создает новую сессию чата"""
     try:
-        user_info = await get_current_user_info(request)
+        user_info = await get_user_from_session(request)
         user_id = user_info['id']
         
         session_name = session_data.get('session_name', f"Сессия {datetime.now().strftime('%Y-%m-%d %H:%M')}")
         
-        chat_session = chat_service.create_chat_session(user_id, session_name)
+        chat_session = await run_in_threadpool(chat_service.create_chat_session, user_id, session_name)
         
         return {
             "success": True,
@@ -1230,23 +1606,23 @@ async def create_chat_session(request: Request, session_data: dict):
 async def get_session_messages(session_id: int, request: Request):
     """Получает сообщения сессии чата"""
     try:
-        user_info = await get_current_user_info(request)
+        user_info = await get_user_from_session(request)
         user_id = user_info['id']
         
         # Проверяем, что сессия принадлежит пользователю
-        session = chat_service.get_session_by_id(session_id)
-        if not session or session.user_id != user_id:
+        if not await run_in_threadpool(chat_service.session_belongs_to_user, session_id, user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Сессия не найдена"
             )
         
-        messages = chat_service.get_session_messages(session_id, limit=100)
+        messages = await run_in_threadpool(chat_service.get_session_messages, session_id, limit=100)
         
-        return {
+        # Список сообщений может быть большим: сериализуем orjson без обхода jsonable_encoder
+        return ORJSONResponse(content={
             "success": True,
             "messages": messages
-        }
+        })
         
     except HTTPException:
         raise
@@ -1261,7 +1637,7 @@ async def get_session_messages(session_id: int, request: Request):
 async def add_chat_message(request: Request, message_data: dict):
     """Добавляет сообщение в сессию чата"""
     try:
-        user_info = await get_current_user_info(request)
+        user_info = await get_user_from_session(request)
         user_id = user_info['id']
         
         session_id = message_data.get('session_id')
@@ -1275,14 +1651,14 @@ async def add_chat_message(request: Request, message_data: dict):
             )
         
         # Проверяем, что сессия принадлежит пользователю
-        session = chat_service.get_session_by_id(session_id)
-        if not session or session.user_id != user_id:
+        if not await run_in_threadpool(chat_service.session_belongs_to_user, session_id, user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Сессия не найдена"
             )
         
-        message_data = chat_service.add_message(
+        message_data = await run_in_threadpool(
+            chat_service.add_message,
             session_id, 
             user_id, 
             message_type, 
@@ -1311,4 +1687,5 @@ async def add_chat_message(request: Request, message_data: dict):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop/http "auto" выбирают uvloop и httptools (uvicorn[standard]), если они доступны на платформе
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto", access_log=False)
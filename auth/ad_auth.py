@@ -8,7 +8,10 @@
 # ============================================================================
 
 import os
+import time
+import queue
 import logging
+import threading
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 
@@ -37,12 +40,17 @@ except ImportError:
     pwd_context = None
     print("⚠️ passlib не установлен. Хеширование паролей будет недоступно.")
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+# Логирование настраивается один раз в app.py
 logger = logging.getLogger(__name__)
 
 # pwd_context уже создан выше в блоке try/except
 
+# Пул соединений LDAP под сервисной учетной записью: размер по умолчанию
+# (active_directory.max_pool_size) и время простоя, после которого соединение
+# не переиспользуется (AD закрывает простаивающие соединения)
+LDAP_POOL_SIZE = 8
+LDAP_POOL_IDLE_TIMEOUT = 300
+
 # ============================================================================
 # ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
 # ============================================================================
@@ -50,6 +58,12 @@ logger = logging.getLogger(__name__)
 class ADAuthenticator:
     """Аутентификатор Active Directory"""
     
+    __slots__ = (
+        'config_manager', 'ad_server', 'ad_domain', 'ad_base_dn', 'ad_service_user',
+        'ad_service_password', 'jwt_secret', 'jwt_algorithm', 'jwt_expire_hours',
+        'ldap_pool_size', '_ldap_pool', '_service_user_dn'
+    )
+    
     def __init__(self):
         """Инициализация аутентификатора"""
         from config.config_manager import ConfigManager
@@ -62,63 +76,74 @@ class ADAuthenticator:
         self.jwt_secret = 'super-secret-key'
         self.jwt_algorithm = 'HS256'
         self.jwt_expire_hours = 24
+        self.ldap_pool_size = LDAP_POOL_SIZE
+        self._ldap_pool = queue.LifoQueue()  # (соединение, время освобождения)
+        self._service_user_dn = None  # вариант DN сервисной учетной записи, прошедший bind
         self._load_config()
     
-    def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
-        """Аутентификация пользователя через LDAP"""
+    def authenticate_user(self, username: str, password: str,
+                          raise_errors: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Аутентификация пользователя через LDAP
+        
+        Args:
+            raise_errors: выбрасывать ошибки LDAP (сервер недоступен, не настроен,
+                не прошел bind служебной учетной записи) вместо возврата None.
+                Тогда None означает только, что пользователь не найден.
+        """
         if not LDAP_AVAILABLE:
             logger.error("❌ LDAP недоступен - библиотека ldap3 не установлена")
+            if raise_errors:
+                raise RuntimeError("LDAP недоступен - библиотека ldap3 не установлена")
             return None
         
         if not self.ad_server:
             logger.error("❌ LDAP сервер не настроен")
+            if raise_errors:
+                raise RuntimeError("LDAP сервер не настроен")
             return None
         
         try:
-
-            server = self.ad_server
-            # 1. Простая аутентификация с sAMAccountName
-            try:
-                user_dn = f"CN={self.ad_service_user},{self.ad_base_dn}"
-                connection = Connection(server, user=user_dn, password=self.ad_service_password)
-                if connection.bind():
-                    user_info = self._get_user_info(connection, username)
-                    if user_info:
-                        return user_info
-            except Exception as e:
-                logger.warning(f"DN аутентификация не удалась: {e}")
+            connection, reused = self._acquire_connection()
+            if connection is None:
+                raise RuntimeError("Не удалось подключиться к LDAP серверу служебной учетной записью")
             
-            # 2. Аутентификация с UPN (User Principal Name)
             try:
-                user_dn = f"{self.ad_service_user}@{self.ad_domain}"
-                connection = Connection(server, user=user_dn, password=self.ad_service_password)
-                if connection.bind():
-                    user_info = self._get_user_info(connection, username)
-                    if user_info:
-                        return user_info    
-            except Exception as e:
-                logger.warning(f"UPN аутентификация не удалась: {e}")
+                user_info = self._get_user_info(connection, username)
+            except Exception:
+                if not (reused and connection.closed):
+                    self._close_connection(connection)
+                    raise
+                user_info = None
             
-            # 3. Аутентификация с sAMAccountName
-            try:
-                user_dn = f"{self.ad_domain}\\{self.ad_service_user}"
-                connection = Connection(server, user=user_dn, password=self.ad_service_password)
-                if connection.bind():
+            if reused and connection.closed:
+                # Сервер закрыл соединение из пула - повторяем запрос на новом
+                self._close_connection(connection)
+                connection = self._bind_service_connection()
+                if connection is None:
+                    raise RuntimeError("Не удалось подключиться к LDAP серверу служебной учетной записью")
+                try:
                     user_info = self._get_user_info(connection, username)
-                    if user_info:
-                        return user_info 
-            except Exception as e:
-                logger.warning(f"sAMAccountName аутентификация не удалась: {e}")
-                       
+                except Exception:
+                    self._close_connection(connection)
+                    raise
+            
+            self._release_connection(connection)
+            if user_info:
+                return user_info
+            
             logger.warning(f"❌ Пользователь не найден в AD: {username}")
-            connection.unbind()
             return None
             
         except LDAPException as e:
             logger.error(f"❌ Ошибка LDAP аутентификации: {e}")
+            if raise_errors:
+                raise
             return None
         except Exception as e:
             logger.error(f"❌ Неожиданная ошибка аутентификации: {e}")
+            if raise_errors:
+                raise
             return None
     
     def create_access_token(self, user_info: Dict[str, Any]) -> str:
@@ -142,7 +167,7 @@ class ADAuthenticator:
             # Создаем токен
             token = jwt.encode(token_data, self.jwt_secret, algorithm=self.jwt_algorithm)
             
-            logger.info(f"✅ Создан JWT токен для пользователя: {user_info['username']}")
+            logger.debug("✅ Создан JWT токен для пользователя: %s", user_info['username'])
             return token
             
         except Exception as e:
@@ -164,7 +189,7 @@ class ADAuthenticator:
                 logger.warning("❌ JWT токен истек")
                 return None
             
-            logger.info(f"✅ JWT токен валиден для пользователя: {payload['username']}")
+            logger.debug("✅ JWT токен валиден для пользователя: %s", payload['username'])
             return payload
             
         except jwt.ExpiredSignatureError:
@@ -181,6 +206,7 @@ class ADAuthenticator:
         """Переподключение к LDAP серверу"""
         logger.info("🔄 Переподключение к LDAP серверу...")
         self._load_config()
+        self._drain_pool()
         logger.info("✅ Переподключение к LDAP завершено")
     
     def is_connected(self) -> bool:
@@ -221,6 +247,7 @@ class ADAuthenticator:
                 self.jwt_secret = jwt_config.get('secret', 'super-secret-key')
                 self.jwt_algorithm = jwt_config.get('algorithm', 'HS256')
                 self.jwt_expire_hours = jwt_config.get('expire_hours', 24)
+                self.ldap_pool_size = ad_config.get('max_pool_size', LDAP_POOL_SIZE)
                 
                 logger.info(f"✅ Конфигурация LDAP загружена: {ad_config.get('server')}")
             else:
@@ -229,9 +256,72 @@ class ADAuthenticator:
         except Exception as e:
             logger.error(f"❌ Ошибка загрузки конфигурации LDAP: {e}")
 
+    def _acquire_connection(self):
+        """
+        Возвращает соединение под сервисной учетной записью: из пула или новое
+        
+        Returns:
+            (соединение или None, признак переиспользования из пула)
+        """
+        now = time.monotonic()
+        while True:
+            try:
+                connection, released_at = self._ldap_pool.get_nowait()
+            except queue.Empty:
+                break
+            if connection.bound and not connection.closed and now - released_at < LDAP_POOL_IDLE_TIMEOUT:
+                return connection, True
+            self._close_connection(connection)
+        return self._bind_service_connection(), False
+    
+    def _release_connection(self, connection: Connection):
+        """Возвращает соединение в пул (лишние и закрытые соединения закрываются)"""
+        if connection.bound and not connection.closed and self._ldap_pool.qsize() < self.ldap_pool_size:
+            self._ldap_pool.put_nowait((connection, time.monotonic()))
+        else:
+            self._close_connection(connection)
+    
+    def _bind_service_connection(self) -> Optional[Connection]:
+        """Открывает соединение и выполняет bind сервисной учетной записи"""
+        candidates = [
+            ("DN", f"CN={self.ad_service_user},{self.ad_base_dn}"),
+            ("UPN", f"{self.ad_service_user}@{self.ad_domain}"),
+            ("sAMAccountName", f"{self.ad_domain}\\{self.ad_service_user}"),
+        ]
+        # Сначала пробуем вариант, который сработал в прошлый раз
+        candidates.sort(key=lambda candidate: candidate[1] != self._service_user_dn)
+        
+        for label, user_dn in candidates:
+            try:
+                connection = Connection(self.ad_server, user=user_dn, password=self.ad_service_password)
+                if connection.bind():
+                    self._service_user_dn = user_dn
+                    return connection
+                self._close_connection(connection)
+            except Exception as e:
+                logger.warning(f"{label} аутентификация не удалась: {e}")
+        return None
+    
+    def _close_connection(self, connection: Connection):
+        """Закрывает соединение LDAP, не пробрасывая ошибки"""
+        try:
+            connection.unbind()
+        except Exception:
+            pass
+    
+    def _drain_pool(self):
+        """Закрывает все соединения пула (при смене конфигурации)"""
+        self._service_user_dn = None
+        while True:
+            try:
+                connection, _ = self._ldap_pool.get_nowait()
+            except queue.Empty:
+                return
+            self._close_connection(connection)
+    
     def _get_user_info(self, conn: Connection, username: str) -> Optional[Dict[str, Any]]:
         """
-        Получает информацию о пользователе из Active Directory
+        Получает информацию о пользователе из Active Directory (None - пользователь не найден)
         """
         try:
             attributes=['sAMAccountName', 'displayName', 'mail', 'cn', 'givenName', 'sn', 'userPrincipalName']
@@ -282,12 +372,25 @@ class ADAuthenticator:
                     return None
             return None    
         except Exception as e:
+            # Ошибку обрабатывает authenticate_user: она не означает, что пользователь не найден
             logger.error(f"Ошибка получения информации о пользователе: {e}")
-            return None
+            raise
 
 # ============================================================================
 # ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
 # ============================================================================
 
-# Глобальный экземпляр аутентификатора
-ad_auth = ADAuthenticator()
+# Глобальный экземпляр аутентификатора создается при первом обращении к ad_auth
+_ad_auth = None
+_ad_auth_lock = threading.Lock()
+
+def __getattr__(name: str):
+    """Ленивое создание глобального экземпляра (PEP 562), потокобезопасное"""
+    global _ad_auth
+    if name == 'ad_auth':
+        if _ad_auth is None:
+            with _ad_auth_lock:
+                if _ad_auth is None:
+                    _ad_auth = ADAuthenticator()
+        return _ad_auth
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
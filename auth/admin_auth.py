@@ -11,6 +11,7 @@ import os
 import hashlib
 import json
 import logging
+import threading
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -24,6 +25,8 @@ logger = logging.getLogger(__name__)
 class AdminAuth:
     """Аутентификатор администратора"""
     
+    __slots__ = ('admin_file', 'default_admin')
+    
     def __init__(self):
         """Инициализация аутентификатора администратора"""
         self.admin_file = "admin_config.json"
@@ -131,5 +134,17 @@ class AdminAuth:
 # ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
 # ============================================================================
 
-# Глобальный экземпляр аутентификатора администратора
-admin_auth = AdminAuth()
+# Глобальный экземпляр аутентификатора администратора создается при первом обращении к admin_auth
+_admin_auth = None
+_admin_auth_lock = threading.Lock()
+
+def __getattr__(name: str):
+    """Ленивое создание глобального экземпляра (PEP 562), потокобезопасное"""
+    global _admin_auth
+    if name == 'admin_auth':
+        if _admin_auth is None:
+            with _admin_auth_lock:
+                if _admin_auth is None:
+                    _admin_auth = AdminAuth()
+        return _admin_auth
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,14 +7,12 @@ Middleware для аутентификации
 # ИНИЦИАЛИЗАЦИЯ МОДУЛЯ
 # ============================================================================
 
-from fastapi import Request, HTTPException, status
-from fastapi.responses import RedirectResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
+import json
 import logging
+from starlette.requests import cookie_parser
+from starlette.responses import RedirectResponse
 
-from .ad_auth import ADAuthenticator
-from .session_manager import SessionManager
+from .session_resolver import session_resolver as default_session_resolver
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +20,14 @@ logger = logging.getLogger(__name__)
 # ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
 # ============================================================================
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    """Middleware для проверки аутентификации"""
+class AuthMiddleware:
+    """Middleware для проверки аутентификации (чистый ASGI, без буферизации ответа)"""
     
-    def __init__(self, app, excluded_paths: list = None, session_manager=None):
+    def __init__(self, app, excluded_paths: list = None, session_resolver=None, allowed_hosts: frozenset = None):
         """Инициализация middleware"""
-        super().__init__(app)
+        self.app = app
+        # Точные значения Host (без порта) в байтах; пустое множество отключает проверку
+        self.allowed_hosts = frozenset(allowed_hosts or ())
         self.excluded_paths = excluded_paths or [
             '/',
             '/login',
@@ -46,74 +46,108 @@ class AuthMiddleware(BaseHTTPMiddleware):
             '/api/admin/config/update',
             '/api/admin/test-connection',
             '/api/admin/change-password',
-            '/favicon.ico'
+            '/favicon.ico',
+            '/healthz',
+            '/readyz'
         ]
-        self.ad_auth = ADAuthenticator()
-        self.session_manager = session_manager  # Сохраняем переданный session_manager
+        # Проверка сессии и JWT токена с кэшированием успешного результата
+        self.session_resolver = session_resolver or default_session_resolver
     
-    async def dispatch(self, request: Request, call_next: Callable):
+    async def __call__(self, scope, receive, send):
         """Обработка запроса через middleware"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if self.allowed_hosts and self._get_host(scope) not in self.allowed_hosts:
+            logger.warning(f"❌ Недопустимый заголовок Host для пути {scope['path']}")
+            await self._send_plain(send, 400, b"Invalid host header")
+            return
+        
+        path = scope["path"]
+        
         # Проверяем, нужно ли исключить путь из проверки авторизации
-        if self._is_excluded_path(request.url.path):
-            response = await call_next(request)
-            return response
+        if self._is_excluded_path(path):
+            await self.app(scope, receive, send)
+            return
         
         # Получаем session_id из cookies
-        session_id = request.cookies.get('session_id')
-        logger.debug(f"🍪 Session ID из cookies: {session_id}")
-        logger.debug(f"📋 Все cookies: {request.cookies}")
+        session_id = self._get_session_id(scope)
+        logger.debug("🍪 Session ID из cookies: %s", session_id)
         
         if not session_id:
-            logger.warning(f"❌ Нет session_id для пути {request.url.path}")
+            logger.warning(f"❌ Нет session_id для пути {path}")
             # Если нет сессии, перенаправляем на страницу логина
-            if request.url.path.startswith('/api/'):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Требуется аутентификация"
-                )
-            else:
-                return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+            await self._reject(scope, receive, send, "Требуется аутентификация")
+            return
         
-        # Проверяем сессию
-        session_data = self.session_manager.get_session(session_id)
+        # Проверяем сессию и JWT токен
+        session_data = self.session_resolver.get_session(session_id)
         if not session_data:
-            logger.warning(f"Недействительная сессия {session_id} для пути {request.url.path}")
-            # Если сессия недействительна, перенаправляем на страницу логина
-            if request.url.path.startswith('/api/'):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Сессия истекла"
-                )
-            else:
-                return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
-        
-        # Проверяем JWT токен
-        access_token = session_data.get('access_token')
-        if access_token:
-            user_info = self.ad_auth.verify_access_token(access_token)
-            if not user_info:
-                logger.warning(f"Недействительный JWT токен для сессии {session_id}")
-                # Если токен недействителен, перенаправляем на страницу логина
-                if request.url.path.startswith('/api/'):
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Токен доступа недействителен"
-                    )
-                else:
-                    return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+            logger.warning(f"Недействительная сессия {session_id} для пути {path}")
+            # Если сессия или токен недействительны, перенаправляем на страницу логина
+            await self._reject(scope, receive, send, "Сессия истекла")
+            return
         
         # Добавляем информацию о пользователе в request state
-        request.state.user_info = session_data.get('user_info', {})
-        request.state.session_id = session_id
+        state = scope.setdefault("state", {})
+        state["user_info"] = session_data.get('user_info', {})
+        state["session_id"] = session_id
         
         # Продолжаем обработку запроса
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 # ============================================================================
 # СЛУЖЕБНЫЕ ФУНКЦИИ
 # ============================================================================
 
+    def _get_session_id(self, scope) -> str:
+        """Извлекает session_id из заголовка Cookie без создания объекта Request"""
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                return cookie_parser(value.decode("latin-1")).get('session_id')
+        return None
+    
+    def _get_host(self, scope) -> bytes:
+        """Извлекает значение Host без порта (IPv6 адрес остается в скобках: [::1])"""
+        for name, value in scope["headers"]:
+            if name == b"host":
+                if value.startswith(b"["):
+                    # Порт может идти только после закрывающей скобки IPv6 литерала
+                    end = value.find(b"]")
+                    return (value[:end + 1] if end != -1 else value).lower()
+                return value.split(b":", 1)[0].lower()
+        return b""
+    
+    async def _send_plain(self, send, status_code: int, body: bytes):
+        """Отправляет текстовый ответ без создания объекта Response"""
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+    
+    async def _reject(self, scope, receive, send, detail: str):
+        """Отвечает 401 для API или перенаправляет на страницу логина"""
+        if self._is_api_path(scope["path"]):
+            body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 401,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        else:
+            response = RedirectResponse(url="/login", status_code=302)
+            await response(scope, receive, send)
+    
     def _is_excluded_path(self, path: str) -> bool:
         """Проверяет, исключен ли путь из проверки авторизации"""
         # Проверяем точное совпадение
@@ -8,6 +8,10 @@
 # ============================================================================
 
 import os
+import hmac
+import time
+import hashlib
+import secrets
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import redis
@@ -17,6 +21,9 @@ from config.config_manager import ConfigManager
 
 logger = logging.getLogger(__name__)
 
+# Максимальный размер in-memory кэша аутентификации (при недоступном Redis)
+AUTH_CACHE_MAXSIZE = 1024
+
 # ============================================================================
 # ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
 # ============================================================================
@@ -24,6 +31,11 @@ logger = logging.getLogger(__name__)
 class SessionManager:
     """Менеджер сессий пользователей"""
     
+    __slots__ = (
+        'config_manager', 'redis_url', 'session_expire_hours', 'redis_client', '_sessions',
+        '_auth_cache', 'auth_cache_ttl', 'auth_cache_negative_ttl', 'auth_cache_secret'
+    )
+    
     def __init__(self):
         """Инициализация менеджера сессий"""
         self.config_manager = ConfigManager()
@@ -31,10 +43,14 @@ class SessionManager:
         self.session_expire_hours = 24
         self.redis_client = None
         self._sessions = {}  # Инициализируем in-memory хранилище
+        self._auth_cache = {}  # in-memory кэш результатов LDAP аутентификации: ключ -> (истекает, данные)
+        self.auth_cache_ttl = 120
+        self.auth_cache_negative_ttl = 15
+        self.auth_cache_secret = ''
         self._load_config()
         self._connect_redis()
     
-    def create_session(self, user_info: Dict[str, Any], access_token: str) -> str:
+    def create_session(self, user_info: Dict[str, Any], access_token: Optional[str]) -> str:
         """Создает новую сессию пользователя"""
         session_id = self._generate_session_id()
         session_data = {
@@ -52,52 +68,45 @@ class SessionManager:
                     self.session_expire_hours * 3600,
                     json.dumps(session_data)
                 )
-                logger.info(f"✅ Сессия создана в Redis: {session_id}")
+                logger.debug("✅ Сессия создана в Redis: %s", session_id)
             except Exception as e:
                 logger.warning(f"⚠️ Ошибка сохранения в Redis, используем in-memory: {e}")
                 self._sessions[session_id] = session_data
         else:
             self._sessions[session_id] = session_data
-            logger.info(f"✅ Сессия создана в памяти: {session_id}")
+            logger.debug("✅ Сессия создана в памяти: %s", session_id)
         
         return session_id
     
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Получает данные сессии"""
-        logger.debug(f"🔍 Поиск сессии: {session_id}")
-        logger.debug(f"📊 Всего сессий в памяти: {len(self._sessions)}")
+        logger.debug("🔍 Поиск сессии: %s", session_id)
+        logger.debug("📊 Всего сессий в памяти: %s", len(self._sessions))
         
         if self.redis_client:
             try:
-                session_data = self.redis_client.get(f"session:{session_id}")
+                # GET и продление TTL одним запросом, без перезаписи данных сессии
+                key = f"session:{session_id}"
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(key)
+                pipe.expire(key, self.session_expire_hours * 3600)
+                session_data, _ = pipe.execute()
                 if session_data:
                     session_dict = json.loads(session_data)
-                    # Обновляем время последней активности
                     session_dict['last_activity'] = datetime.utcnow().isoformat()
-                    self.redis_client.setex(
-                        f"session:{session_id}",
-                        self.session_expire_hours * 3600,
-                        json.dumps(session_dict)
-                    )
-                    logger.debug(f"✅ Сессия найдена в Redis: {session_id}")
+                    logger.debug("✅ Сессия найдена в Redis: %s", session_id)
                     return session_dict
-                logger.debug(f"❌ Сессия не найдена в Redis: {session_id}")
+                logger.debug("❌ Сессия не найдена в Redis: %s", session_id)
                 return None
             except Exception as e:
                 logger.warning(f"⚠️ Ошибка получения из Redis: {e}")
-                session_data = self._sessions.get(session_id)
-                if session_data:
-                    logger.debug(f"✅ Сессия найдена в памяти: {session_id}")
-                else:
-                    logger.debug(f"❌ Сессия не найдена в памяти: {session_id}")
-                return session_data
+        
+        session_data = self._get_memory_session(session_id)
+        if session_data:
+            logger.debug("✅ Сессия найдена в памяти: %s", session_id)
         else:
-            session_data = self._sessions.get(session_id)
-            if session_data:
-                logger.debug(f"✅ Сессия найдена в памяти: {session_id}")
-            else:
-                logger.debug(f"❌ Сессия не найдена в памяти: {session_id}")
-            return session_data
+            logger.debug("❌ Сессия не найдена в памяти: %s", session_id)
+        return session_data
     
     def update_session(self, session_id: str, user_info: Dict[str, Any] = None, access_token: str = None):
         """Обновляет данные сессии"""
@@ -133,13 +142,13 @@ class SessionManager:
         if self.redis_client:
             try:
                 self.redis_client.delete(f"session:{session_id}")
-                logger.info(f"✅ Сессия удалена из Redis: {session_id}")
+                logger.debug("✅ Сессия удалена из Redis: %s", session_id)
             except Exception as e:
                 logger.warning(f"⚠️ Ошибка удаления из Redis: {e}")
                 self._sessions.pop(session_id, None)
         else:
             self._sessions.pop(session_id, None)
-            logger.info(f"✅ Сессия удалена из памяти: {session_id}")
+            logger.debug("✅ Сессия удалена из памяти: %s", session_id)
     
     def get_all_sessions(self) -> Dict[str, Dict[str, Any]]:
         """Получает все активные сессии"""
@@ -164,32 +173,67 @@ class SessionManager:
         expired_sessions = []
         
         if self.redis_client:
-            try:
-                for key in self.redis_client.scan_iter(match="session:*"):
-                    session_data = self.redis_client.get(key)
-                    if session_data:
-                        session_dict = json.loads(session_data)
-                        last_activity = datetime.fromisoformat(session_dict['last_activity'])
-                        if (current_time - last_activity).total_seconds() > self.session_expire_hours * 3600:
-                            expired_sessions.append(key)
-                
-                for key in expired_sessions:
-                    self.redis_client.delete(key)
-                
-                logger.info(f"✅ Очищено {len(expired_sessions)} истекших сессий из Redis")
-            except Exception as e:
-                logger.warning(f"⚠️ Ошибка очистки сессий в Redis: {e}")
+            # Сессии в Redis истекают по TTL, который продлевается при каждом обращении
+            logger.info("ℹ️ Сессии в Redis удаляются по TTL, очистка не требуется")
         else:
-            for session_id, session_data in self._sessions.items():
+            # Снимок элементов: хранилище может меняться из других потоков
+            for session_id, session_data in list(self._sessions.items()):
                 last_activity = datetime.fromisoformat(session_data['last_activity'])
                 if (current_time - last_activity).total_seconds() > self.session_expire_hours * 3600:
                     expired_sessions.append(session_id)
             
             for session_id in expired_sessions:
-                del self._sessions[session_id]
+                self._sessions.pop(session_id, None)
             
             logger.info(f"✅ Очищено {len(expired_sessions)} истекших сессий из памяти")
     
+    def get_cached_auth(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает закэшированный результат LDAP аутентификации
+        
+        Returns:
+            {'ok': bool, 'info': данные пользователя или None} или None, если в кэше нет записи
+        """
+        key = self._auth_cache_key(username, password)
+        
+        if self.redis_client:
+            try:
+                cached = self.redis_client.get(key)
+                return json.loads(cached) if cached else None
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка чтения кэша аутентификации из Redis: {e}")
+        
+        entry = self._auth_cache.get(key)
+        if not entry:
+            return None
+        expires_at, cached = entry
+        if expires_at < time.monotonic():
+            self._auth_cache.pop(key, None)
+            return None
+        return cached
+    
+    def cache_auth(self, username: str, password: str, user_info: Optional[Dict[str, Any]]):
+        """Кэширует результат LDAP аутентификации (неудачные попытки - на меньший срок)"""
+        key = self._auth_cache_key(username, password)
+        cached = {'ok': bool(user_info), 'info': dict(user_info) if user_info else None}
+        ttl = self.auth_cache_ttl if user_info else self.auth_cache_negative_ttl
+        
+        if self.redis_client:
+            try:
+                self.redis_client.setex(key, ttl, json.dumps(cached))
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка записи кэша аутентификации в Redis: {e}")
+        
+        now = time.monotonic()
+        if len(self._auth_cache) >= AUTH_CACHE_MAXSIZE:
+            # Удаляем истекшие записи, при переполнении - самые старые
+            for stale_key in [k for k, (expires_at, _) in self._auth_cache.items() if expires_at < now]:
+                del self._auth_cache[stale_key]
+            while len(self._auth_cache) >= AUTH_CACHE_MAXSIZE:
+                self._auth_cache.pop(next(iter(self._auth_cache)))
+        self._auth_cache[key] = (now + ttl, cached)
+    
     def reconnect(self):
         """Переподключается с новой конфигурацией"""
         self._load_config()
@@ -216,6 +260,16 @@ class SessionManager:
         
         session_config = self.config_manager.get_service_config('session')
         self.session_expire_hours = session_config.get('expire_hours', 24)
+        self.auth_cache_ttl = session_config.get('auth_cache_ttl', 120)
+        self.auth_cache_negative_ttl = session_config.get('auth_cache_negative_ttl', 15)
+        # Секрет HMAC для ключей кэша аутентификации: общий для воркеров, если задан,
+        # иначе случайный для процесса
+        self.auth_cache_secret = (
+            session_config.get('auth_cache_secret')
+            or os.getenv('AUTH_CACHE_SECRET')
+            or self.auth_cache_secret
+            or secrets.token_hex(32)
+        )
     
     def _connect_redis(self):
         """Подключение к Redis для хранения сессий"""
@@ -228,10 +282,39 @@ class SessionManager:
             self.redis_client = None
             # _sessions уже инициализирован в конструкторе
     
+    def _auth_cache_key(self, username: str, password: str) -> str:
+        """Ключ кэша аутентификации: HMAC-SHA256, пароль в открытом виде не хранится"""
+        digest = hmac.new(
+            self.auth_cache_secret.encode(),
+            f"{username}:{password}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        return f"ldap:auth:{digest}"
+    
+    def _get_memory_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает сессию из in-memory хранилища с проверкой срока действия
+        
+        Хранилище - обычный dict без блокировок: отдельные операции get/pop/присваивание
+        атомарны, а данные сессии заменяются целиком.
+        """
+        session_data = self._sessions.get(session_id)
+        if not session_data:
+            return None
+        
+        now = datetime.utcnow()
+        last_activity = datetime.fromisoformat(session_data['last_activity'])
+        if (now - last_activity).total_seconds() > self.session_expire_hours * 3600:
+            self._sessions.pop(session_id, None)
+            return None
+        
+        session_data = {**session_data, 'last_activity': now.isoformat()}
+        self._sessions[session_id] = session_data
+        return session_data
+    
     def _generate_session_id(self) -> str:
-        """Генерирует уникальный ID сессии"""
-        import uuid
-        return str(uuid.uuid4())
+        """Генерирует уникальный ID сессии (256 бит, символы безопасны для cookie)"""
+        return secrets.token_urlsafe(32)
 
 # ============================================================================
 # ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Кэширующая проверка сессий пользователей
+"""
+
+# ============================================================================
+# ИНИЦИАЛИЗАЦИЯ МОДУЛЯ
+# ============================================================================
+
+import time
+import logging
+from typing import Optional, Dict, Any
+from cachetools import TTLCache
+
+from . import ad_auth as ad_auth_module
+from .session_manager import session_manager as default_session_manager
+
+logger = logging.getLogger(__name__)
+
+# Размер кэша и предельный срок жизни записи. Срок ограничивает, насколько долго
+# другой воркер может считать сессию действительной после выхода пользователя
+SESSION_CACHE_MAXSIZE = 4096
+SESSION_CACHE_TTL = 60
+
+# ============================================================================
+# ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
+# ============================================================================
+
+class CachingSessionResolver:
+    """
+    Проверяет сессию и ее JWT токен с кэшированием успешного результата
+
+    Запись живет до истечения JWT (exp), но не дольше SESSION_CACHE_TTL.
+    У локальных сессий токена нет, их срок задает только менеджер сессий.
+    Неудачные проверки не кэшируются.
+    """
+
+    __slots__ = ('session_manager', '_cache')
+
+    def __init__(self, session_manager=None, maxsize: int = SESSION_CACHE_MAXSIZE,
+                 ttl: int = SESSION_CACHE_TTL):
+        """Инициализация кэша проверенных сессий"""
+        self.session_manager = session_manager or default_session_manager
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Возвращает данные действительной сессии или None"""
+        now = time.time()
+        entry = self._cache.get(session_id)
+        if entry is not None:
+            session_data, expires_at = entry
+            if now < expires_at:
+                return session_data
+            self._cache.pop(session_id, None)
+
+        session_data = self.session_manager.get_session(session_id)
+        if not session_data:
+            return None
+
+        expires_at = now + self._cache.ttl
+        access_token = session_data.get('access_token')
+        if access_token:
+            payload = ad_auth_module.ad_auth.verify_access_token(access_token)
+            if not payload:
+                logger.warning(f"Недействительный JWT токен для сессии {session_id}")
+                return None
+            expires_at = min(expires_at, payload['exp'])
+
+        self._cache[session_id] = (session_data, expires_at)
+        return session_data
+
+    def invalidate(self, session_id: str):
+        """Удаляет сессию из кэша (при выходе пользователя)"""
+        self._cache.pop(session_id, None)
+
+    def clear(self):
+        """Очищает кэш (при смене конфигурации сессий или JWT)"""
+        self._cache.clear()
+
+# ============================================================================
+# ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
+# ============================================================================
+
+# Глобальный экземпляр, общий для middleware и обработчиков
+session_resolver = CachingSessionResolver()
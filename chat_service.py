@@ -105,7 +105,7 @@ class ChatService:
                     logger.info(f"[OK] Обновлен пользователь: {username} (ID: {user.id})")
                     logger.info(f"   Изменения: {', '.join(changes)}")
                 else:
-                    logger.info(f"[OK] Обновлен пользователь: {username} (ID: {user.id}) - только last_login")
+                    logger.debug("[OK] Обновлен пользователь: %s (ID: %s) - только last_login", username, user.id)
             
             # Отсоединяем объект от сессии и возвращаем данные
             session.expunge(user)
@@ -230,6 +230,13 @@ class ChatService:
             chat_session = session.query(ChatSession).filter(ChatSession.id == session_id).first()
             return chat_session
     
+    def session_belongs_to_user(self, session_id: int, user_id: int) -> bool:
+        """Проверяет, что сессия чата принадлежит пользователю (один запрос по первичному ключу)"""
+        with get_db() as session:
+            return session.query(ChatSession.id).filter(
+                and_(ChatSession.id == session_id, ChatSession.user_id == user_id)
+            ).first() is not None
+    
     def close_session(self, session_id: int):
         """Закрывает сессию чата"""
         with get_db() as session:
@@ -245,40 +252,70 @@ class ChatService:
     def add_message(self, session_id: int, user_id: int, message_type: str, 
                    content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
         """Добавляет сообщение в сессию"""
+        return self.add_messages(session_id, user_id, [{
+            'message_type': message_type,
+            'content': content,
+            'metadata': metadata
+        }])[0]
+    
+    def add_messages(self, session_id: int, user_id: int,
+                     messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Добавляет несколько сообщений в сессию одной транзакцией
+        
+        Args:
+            session_id: ID сессии чата
+            user_id: ID пользователя
+            messages: список словарей с ключами message_type, content,
+                      metadata и необязательным created_at
+        
+        Returns:
+            Данные добавленных сообщений в том же порядке
+        """
         with get_db() as session:
-            message = Message(
-                session_id=session_id,
-                user_id=user_id,
-                message_type=message_type,
-                content=content,
-                message_metadata=metadata or {}
-            )
-            session.add(message)
-            session.commit()
-            session.refresh(message)
+            rows = []
+            for item in messages:
+                message = Message(
+                    session_id=session_id,
+                    user_id=user_id,
+                    message_type=item['message_type'],
+                    content=item['content'],
+                    message_metadata=item.get('metadata') or {}
+                )
+                if item.get('created_at'):
+                    message.created_at = item['created_at']
+                rows.append(message)
+            session.add_all(rows)
+            # flush присваивает ID, сообщения и время обновления сессии фиксируются одной транзакцией
+            session.flush()
             
             # Обновляем время последнего обновления сессии
-            chat_session = session.query(ChatSession).filter(ChatSession.id == session_id).first()
-            if chat_session:
-                chat_session.updated_at = datetime.utcnow()
-                session.commit()
+            session.query(ChatSession).filter(ChatSession.id == session_id).update(
+                {ChatSession.updated_at: datetime.utcnow()},
+                synchronize_session=False
+            )
             
-            # Сохраняем данные сообщения до отсоединения от сессии
-            message_data = {
-                'id': message.id,
-                'session_id': message.session_id,
-                'user_id': message.user_id,
-                'message_type': message.message_type,
-                'content': message.content,
-                'message_metadata': message.message_metadata,
-                'created_at': message.created_at
-            }
+            # Сохраняем данные сообщений до фиксации и отсоединения от сессии
+            messages_data = [
+                {
+                    'id': message.id,
+                    'session_id': message.session_id,
+                    'user_id': message.user_id,
+                    'message_type': message.message_type,
+                    'content': message.content,
+                    'message_metadata': message.message_metadata,
+                    'created_at': message.created_at
+                }
+                for message in rows
+            ]
+            session.commit()
             
-            # Отсоединяем объект от сессии
-            session.expunge(message)
+            # Отсоединяем объекты от сессии
+            for message in rows:
+                session.expunge(message)
             
-            logger.info(f"[OK] Добавлено сообщение в сессию {session_id}")
-            return message_data
+            logger.debug("[OK] Добавлено сообщений в сессию %s: %s", session_id, len(rows))
+            return messages_data
     
     def get_session_messages(self, session_id: int, limit: int = 50) -> List[Dict[str, Any]]:
         """Получает сообщения сессии"""
@@ -304,18 +341,23 @@ class ChatService:
             return result
     
     def get_session_history(self, session_id: int, limit: int = None) -> List[Dict[str, Any]]:
-        """Получает полную историю сессии с инструментами"""
+        """
+        Получает историю сессии с инструментами
+        
+        При заданном limit возвращаются последние limit сообщений в хронологическом порядке.
+        Инструменты всех сообщений загружаются одним запросом.
+        """
         with get_db() as session:
-            query = session.query(Message).filter(
-                Message.session_id == session_id
-            ).order_by(Message.created_at)
+            query = session.query(Message).filter(Message.session_id == session_id)
             
             if limit:
-                query = query.limit(limit)
-            
-            messages = query.all()
+                messages = query.order_by(desc(Message.created_at), desc(Message.id)).limit(limit).all()
+                messages.reverse()
+            else:
+                messages = query.order_by(Message.created_at).all()
             
             history = []
+            history_by_message_id = {}
             for msg in messages:
                 # Отсоединяем объект от сессии перед использованием
                 session.expunge(msg)
@@ -328,12 +370,16 @@ class ChatService:
                     'metadata': msg.message_metadata or {},
                     'tools': []
                 }
-                
-                # Получаем инструменты отдельным запросом
-                tools = session.query(ToolUsage).filter(ToolUsage.message_id == msg.id).all()
+                history.append(message_data)
+                history_by_message_id[msg.id] = message_data
+            
+            if history_by_message_id:
+                tools = session.query(ToolUsage).filter(
+                    ToolUsage.message_id.in_(list(history_by_message_id))
+                ).order_by(ToolUsage.id).all()
                 for tool in tools:
                     session.expunge(tool)
-                    message_data['tools'].append({
+                    history_by_message_id[tool.message_id]['tools'].append({
                         'tool_name': tool.tool_name,
                         'server_name': tool.server_name,
                         'arguments': tool.arguments or {},
@@ -341,8 +387,6 @@ class ChatService:
                         'execution_time_ms': tool.execution_time_ms,
                         'created_at': tool.created_at.isoformat()
                     })
-                
-                history.append(message_data)
             
             return history
     
@@ -368,7 +412,7 @@ class ChatService:
             # Отсоединяем объект от сессии и возвращаем данные
             session.expunge(tool_usage)
             
-            logger.info(f"[OK] Добавлено использование инструмента: {tool_name}")
+            logger.debug("[OK] Добавлено использование инструмента: %s", tool_name)
             return {
                 'id': tool_usage.id,
                 'message_id': tool_usage.message_id,
@@ -8,9 +8,10 @@
 # ============================================================================
 
 import os
+import copy
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
@@ -102,12 +103,26 @@ class ConfigManager:
                 "enabled": True
             }
         }
+        # Конфигурация из файла, объединенная со значениями по умолчанию,
+        # и ключ версии файла (mtime, размер), по которому она построена
+        self._file_config_cache = None
+        self._file_config_version = None
         self._ensure_config_file()
     
     def get_config(self) -> Dict[str, Any]:
         """Получает полную конфигурацию"""
         return self._load_config()
     
+    def get_config_with_version(self) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Получает полную конфигурацию и ее версию
+        
+        Версия строится по времени изменения и размеру файла, поэтому совпадает
+        во всех воркерах и меняется при любом сохранении. None - версия неизвестна.
+        """
+        config, version = self._load_versioned_config()
+        return config, (f"{version[0]:x}-{version[1]:x}" if version else None)
+    
     def get_service_config(self, service: str) -> Dict[str, Any]:
         """Получает конфигурацию конкретного сервиса"""
         config = self._load_config()
@@ -116,7 +131,8 @@ class ConfigManager:
     def update_config(self, section: str, settings: Dict[str, Any], updated_by: str = "user") -> bool:
         """Обновляет конфигурацию секции"""
         try:
-            config = self._load_config()
+            # Копия: закэшированная конфигурация общая для всех вызывающих
+            config = copy.deepcopy(self._load_config())
             
             if section not in config:
                 config[section] = {}
@@ -138,6 +154,11 @@ class ConfigManager:
             logger.error(f"[ERROR] Ошибка обновления конфигурации: {e}")
             return False
     
+    def invalidate(self):
+        """Сбрасывает кэш конфигурации (следующее обращение перечитает файл)"""
+        self._file_config_cache = None
+        self._file_config_version = None
+    
     def reset_config(self) -> bool:
         """Сбрасывает конфигурацию к значениям по умолчанию"""
         try:
@@ -238,17 +259,30 @@ class ConfigManager:
     
     def _load_config(self) -> Dict[str, Any]:
         """Загружает конфигурацию из файла"""
+        return self._load_versioned_config()[0]
+    
+    def _load_versioned_config(self) -> Tuple[Dict[str, Any], Optional[Tuple[int, int]]]:
+        """Загружает конфигурацию из файла вместе с ключом версии, по которому она построена"""
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            # Файл перечитывается только при изменении (в т.ч. другим экземпляром менеджера)
+            stat = os.stat(self.config_file)
+            version = (stat.st_mtime_ns, stat.st_size)
+            config = self._file_config_cache
+            if config is None or self._file_config_version != version:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    file_config = json.load(f)
                 # Объединяем с конфигурацией по умолчанию для новых полей
-                return self._merge_configs(self.default_config, config)
+                config = self._merge_configs(self.default_config, file_config)
+                self._file_config_cache = config
+                self._file_config_version = version
+            return config, version
         except Exception as e:
             logger.error(f"[ERROR] Ошибка загрузки конфигурации: {e}")
-            return self.default_config.copy()
+            return self.default_config.copy(), None
     
     def _save_config(self, config: Dict[str, Any]):
         """Сохраняет конфигурацию в файл"""
+        self.invalidate()
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+CORS middleware с заранее подготовленными заголовками
+"""
+
+# ============================================================================
+# ИНИЦИАЛИЗАЦИЯ МОДУЛЯ
+# ============================================================================
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Разрешенные методы (аналог allow_methods=["*"] в CORSMiddleware Starlette)
+CORS_ALLOW_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+CORS_MAX_AGE = 600
+
+# ============================================================================
+# ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
+# ============================================================================
+
+class FastCORSMiddleware:
+    """
+    Чистый ASGI CORS middleware для конфигурации allow_methods=["*"],
+    allow_headers=["*"], allow_credentials=True и allow_origins=["*"]
+    либо заданного списка origin
+
+    Повторяет поведение CORSMiddleware Starlette, но заголовки собираются
+    один раз при создании, а запрос разбирается за один проход по заголовкам.
+    Разрешенный origin копируется в ответ как есть, без декодирования.
+    """
+
+    def __init__(self, app, allowed_origins: frozenset = None):
+        """
+        Инициализация middleware
+        
+        Args:
+            app: ASGI приложение
+            allowed_origins: разрешенные origin в байтах; пусто - разрешены все
+        """
+        self.app = app
+        self.allowed_origins = frozenset(allowed_origins or ())
+        self._allow_methods = {method.encode() for method in CORS_ALLOW_METHODS}
+        self._preflight_headers = [
+            (b"vary", b"Origin"),
+            (b"access-control-allow-methods", ", ".join(CORS_ALLOW_METHODS).encode()),
+            (b"access-control-max-age", str(CORS_MAX_AGE).encode()),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+        self._simple_headers = [
+            (b"access-control-allow-origin", b"*"),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+        self._credentials_header = (b"access-control-allow-credentials", b"true")
+
+    async def __call__(self, scope, receive, send):
+        """Обработка ASGI вызова"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        has_cookie = False
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"cookie":
+                has_cookie = True
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        origin_allowed = not self.allowed_origins or origin in self.allowed_origins
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._send_preflight(send, origin, origin_allowed, request_method, request_headers)
+            return
+
+        # Для запросов с cookie и при списке origin нужен конкретный origin вместо '*'
+        explicit_origin = has_cookie or bool(self.allowed_origins)
+        if not origin_allowed:
+            cors_headers = [self._credentials_header]
+        elif explicit_origin:
+            cors_headers = [(b"access-control-allow-origin", origin), self._credentials_header]
+        else:
+            cors_headers = self._simple_headers
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.extend(cors_headers)
+                if explicit_origin and origin_allowed:
+                    _add_vary_origin(headers)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+# ============================================================================
+# СЛУЖЕБНЫЕ ФУНКЦИИ
+# ============================================================================
+
+    async def _send_preflight(self, send, origin: bytes, origin_allowed: bool,
+                              request_method: bytes, request_headers: bytes):
+        """Отправляет ответ на preflight запрос"""
+        headers = list(self._preflight_headers)
+        if origin_allowed:
+            headers.append((b"access-control-allow-origin", origin))
+        # Разрешены все заголовки: возвращаем запрошенные
+        if request_headers is not None:
+            headers.append((b"access-control-allow-headers", request_headers))
+
+        failures = []
+        if not origin_allowed:
+            failures.append(b"origin")
+        if request_method not in self._allow_methods:
+            failures.append(b"method")
+
+        if failures:
+            status, body = 400, b"Disallowed CORS " + b", ".join(failures)
+        else:
+            status, body = 200, b"OK"
+
+        headers.append((b"content-type", b"text/plain; charset=utf-8"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+def _add_vary_origin(headers: list):
+    """Добавляет Origin в заголовок Vary, объединяя с существующим значением"""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            headers[index] = (name, value + b", Origin")
+            return
+    headers.append((b"vary", b"Origin"))
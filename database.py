@@ -18,6 +18,11 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Параметры пула соединений
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 20
+DB_POOL_RECYCLE = 3600
+
 # ============================================================================
 # МОДЕЛИ ДАННЫХ
 # ============================================================================
@@ -99,7 +104,16 @@ class DatabaseManager:
     
     def __init__(self, database_url: str):
         """Инициализация менеджера базы данных"""
-        self.engine = create_engine(database_url)
+        engine_kwargs = {'pool_pre_ping': True}
+        if not database_url.startswith('sqlite'):
+            engine_kwargs.update(
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_recycle=DB_POOL_RECYCLE
+            )
+        self.engine = create_engine(database_url, **engine_kwargs)
+        # Каждый вызов get_db() получает свою сессию; "with get_db()" закрывает ее
+        # и возвращает соединение в пул (вызовы chat_service идут из разных потоков пула)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
     def create_tables(self):
@@ -115,6 +129,15 @@ class DatabaseManager:
         """Возвращает сессию базы данных"""
         return self.SessionLocal()
     
+    def ping(self) -> bool:
+        """Быстрая проверка доступности базы данных (без логирования)"""
+        try:
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+            return True
+        except Exception:
+            return False
+    
     def test_connection(self):
         """Тестирует подключение к базе данных"""
         try:
@@ -160,4 +183,8 @@ def get_db():
 
 def is_database_enabled() -> bool:
     """Проверяет, включена ли база данных"""
-    return db_manager is not None
\ No newline at end of file
+    return db_manager is not None
+
+def ping_database() -> bool:
+    """Проверяет доступность базы данных (отключенная база не считается ошибкой)"""
+    return db_manager is None or db_manager.ping()
\ No newline at end of file
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Общий асинхронный HTTP клиент для исходящих запросов к LLM API
+"""
+
+# ============================================================================
+# ИНИЦИАЛИЗАЦИЯ МОДУЛЯ
+# ============================================================================
+
+import logging
+import threading
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Таймауты совпадают со значениями по умолчанию SDK OpenAI/Anthropic:
+# генерация ответа LLM может длиться минутами
+HTTP_TIMEOUT = 600.0
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_MAX_CONNECTIONS = 200
+HTTP_MAX_KEEPALIVE = 100
+
+# ============================================================================
+# ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
+# ============================================================================
+
+def get_http_client() -> Optional[httpx.AsyncClient]:
+    """
+    Возвращает общий HTTP/2 клиент, создавая его при первом обращении
+
+    Клиент держит пул keep-alive соединений: TCP и TLS рукопожатия выполняются
+    один раз, а запросы к одному API мультиплексируются по HTTP/2.
+    Соединения привязаны к event loop приложения, поэтому вне главного потока
+    (проверки подключения через asyncio.run в пуле потоков) возвращается None,
+    и SDK создает собственный клиент.
+    """
+    global _http_client
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            ),
+            follow_redirects=True
+        )
+        logger.debug("🌐 Создан общий HTTP клиент")
+    return _http_client
+
+async def close_http_client():
+    """Закрывает общий HTTP клиент и его соединения"""
+    global _http_client
+    if _http_client is not None:
+        try:
+            await _http_client.aclose()
+            logger.info("[OK] Общий HTTP клиент закрыт")
+        except Exception as e:
+            logger.warning(f"[WARN] Ошибка закрытия общего HTTP клиента: {e}")
+        _http_client = None
+
+# ============================================================================
+# ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
+# ============================================================================
+
+# Общий экземпляр клиента (создается лениво)
+_http_client: Optional[httpx.AsyncClient] = None
@@ -8,6 +8,7 @@ import asyncio
 from typing import Dict, Any, List, Optional
 from config.llm_config import LLMConfig
 from llm_providers.base_provider import BaseLLMProvider
+from http_client import get_http_client
 
 try:
     import anthropic
@@ -26,7 +27,8 @@ class AnthropicProvider(BaseLLMProvider):
         
         self.client = AsyncAnthropic(
             api_key=self.config.api_key,
-            base_url=self.config.base_url
+            base_url=self.config.base_url,
+            http_client=get_http_client()
         )
     
     async def generate_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
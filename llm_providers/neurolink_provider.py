@@ -30,7 +30,13 @@ class NeurolinkProvider(BaseLLMProvider):
         """Получает или создает HTTP сессию"""
         if self.session is None or self.session.closed:
             timeout = aiohttp.ClientTimeout(total=self.timeout)
-            self.session = aiohttp.ClientSession(timeout=timeout)
+            # Keep-alive пул соединений с кэшем DNS, cookies API не использует
+            connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                timeout=timeout,
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
         return self.session
     
     async def generate_response(self, messages: List[Dict[str, str]], temperature: float = -1, **kwargs) -> str:
@@ -6,7 +6,7 @@ MCP клиент для работы с MCP серверами
 import logging
 import asyncio
 from typing import Dict, Any, List, Optional
-from mcp_servers.server_discovery import MCPServerDiscovery
+from mcp_servers.server_discovery import server_discovery
 from mcp_servers.base_mcp_server import BaseMCPServer
 
 logger = logging.getLogger(__name__)
@@ -14,12 +14,19 @@ logger = logging.getLogger(__name__)
 class MCPClient:
     """Клиент для работы с MCP серверами"""
     
-    def __init__(self):
+    def __init__(self, llm_client=None):
         """Инициализирует MCP клиент"""
         self.servers = {}
         self.builtin_servers = {}
-        self.server_discovery = MCPServerDiscovery()
+        # Общий объект обнаружения: серверы сканируются один раз при импорте,
+        # экземпляры разделяются с админ-панелью
+        self.server_discovery = server_discovery
         self._initialized = False
+        
+        # LLM клиент и процессор инструментов живут все время работы приложения,
+        # чтобы HTTP соединения провайдера переиспользовались между сообщениями
+        self.llm_client = llm_client
+        self._tool_processor = None
     
     async def initialize_servers(self):
         """Инициализирует все доступные серверы"""
@@ -34,9 +41,8 @@ class MCPClient:
             
             for server_name in discovered_server_names:
                 try:
-                    server_class = self.server_discovery.get_server_class(server_name)
-                    if server_class:
-                        server_instance = server_class()
+                    server_instance = self.server_discovery.create_server_instance(server_name)
+                    if server_instance:
                         await server_instance.initialize()
                         
                         self.servers[server_name] = server_instance
@@ -180,11 +186,7 @@ class MCPClient:
             }
             
             # Используем intelligent_tool_processor для обработки
-            from intelligent_tool_processor import IntelligentToolProcessor
-            from llm_client import LLMClient
-            
-            llm_client = LLMClient()
-            processor = IntelligentToolProcessor(llm_client, self)
+            processor = self._get_tool_processor()
             
             result = await processor.process_with_intelligent_tools(tools_context)
             
@@ -194,6 +196,23 @@ class MCPClient:
             logger.error(f"[ERROR] Ошибка обработки сообщения с LLM: {e}")
             return f"Извините, произошла ошибка при обработке вашего запроса: {str(e)}"
     
+    def set_llm_client(self, llm_client):
+        """Устанавливает общий LLM клиент приложения"""
+        self.llm_client = llm_client
+        self._tool_processor = None
+    
+    def _get_tool_processor(self):
+        """Возвращает процессор инструментов, создавая LLM клиент при первом обращении"""
+        if self._tool_processor is None:
+            from intelligent_tool_processor import IntelligentToolProcessor
+            
+            if self.llm_client is None:
+                from llm_client import LLMClient
+                self.llm_client = LLMClient()
+            
+            self._tool_processor = IntelligentToolProcessor(self.llm_client, self)
+        return self._tool_processor
+    
     async def close_all_sessions(self):
         """Закрывает все сессии серверов"""
         try:
@@ -217,6 +236,13 @@ class MCPClient:
                 except Exception as e:
                     logger.error(f"[ERROR] Ошибка закрытия сессии встроенного сервера {server_name}: {e}")
             
+            # Закрываем HTTP сессию LLM провайдера
+            if self.llm_client:
+                try:
+                    await self.llm_client.close()
+                except Exception as e:
+                    logger.error(f"[ERROR] Ошибка закрытия LLM клиента: {e}")
+            
             logger.info("[OK] Все MCP сессии закрыты")
             
         except Exception as e:
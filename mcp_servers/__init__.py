@@ -38,4 +38,8 @@ def get_server_names():
 
 def create_server_instance(server_name: str):
     """Создает экземпляр сервера по имени"""
-    return server_discovery.create_server_instance(server_name)
\ No newline at end of file
+    return server_discovery.create_server_instance(server_name)
+
+def get_server_instances():
+    """Возвращает закэшированные экземпляры всех обнаруженных серверов"""
+    return server_discovery.get_server_instances()
\ No newline at end of file
@@ -143,6 +143,13 @@ class MCPServerDiscovery:
                 return None
         return None
     
+    def get_server_instances(self) -> Dict[str, Any]:
+        """Возвращает закэшированные экземпляры всех обнаруженных серверов {имя: экземпляр}"""
+        for server_name in self.discovered_servers:
+            if server_name not in self._server_instances:
+                self.create_server_instance(server_name)
+        return dict(self._server_instances)
+    
     def rescan_servers(self):
         """Пересканирует серверы (полезно при добавлении новых файлов)"""
         self.discovered_servers.clear()
@@ -86,6 +86,7 @@ class AdminInfo(BaseModel):
 # Code Analysis models
 class CodeAnalysisRequest(BaseModel):
     task_key: str
+    force: bool = False
 
 class CodeAnalysisResponse(BaseModel):
     success: bool
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Middleware замера времени обработки запросов (заголовок Server-Timing)
+"""
+
+# ============================================================================
+# ИНИЦИАЛИЗАЦИЯ МОДУЛЯ
+# ============================================================================
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ключ списка дополнительных замеров в scope["state"]
+TIMINGS_STATE_KEY = "timings"
+
+# ============================================================================
+# ПРОГРАММНЫЙ ИНТЕРФЕЙС (API)
+# ============================================================================
+
+class RequestTimingMiddleware:
+    """
+    Чистый ASGI middleware: добавляет к ответу заголовок Server-Timing
+
+    Общее время считается до начала отправки ответа. Обработчики могут добавить
+    свои замеры через record_timing(), они попадут в тот же заголовок.
+    """
+
+    def __init__(self, app):
+        """Инициализация middleware"""
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """Обработка ASGI вызова"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter_ns()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter_ns() - started) / 1_000_000
+                entries = scope.get("state", {}).get(TIMINGS_STATE_KEY, ())
+                value = ", ".join(
+                    [f"{name};dur={duration_ms:.1f}" for name, duration_ms in entries]
+                    + [f"total;dur={total_ms:.1f}"]
+                )
+                message["headers"] = list(message.get("headers", ())) + [(b"server-timing", value.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+def record_timing(request, name: str, duration_ms: float):
+    """Добавляет замер этапа обработки запроса в заголовок Server-Timing"""
+    state = request.scope.setdefault("state", {})
+    state.setdefault(TIMINGS_STATE_KEY, []).append((name, duration_ms))